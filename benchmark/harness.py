@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+from multiprocessing import Process, active_children
+from os import _exit, environ
+from resource import RUSAGE_SELF, getrusage
+from sys import stdout
+from threading import Lock, Thread
+from time import perf_counter, sleep, time
+from urllib.request import urlopen
+
+from benchmark import standin, standin_ws
+
+
+class CycleRecorder(object):
+    def __init__(self):
+        self.__lock = Lock()
+        self.__cycles = {}
+
+    def record(self, name, elapsed):
+        with self.__lock:
+            if name not in self.__cycles:
+                self.__cycles[name] = []
+            self.__cycles[name].append(elapsed)
+
+    def wrap(self, target, submit):
+
+        name = target.__class__.__name__
+
+        if submit is None:
+
+            poll = target.poll
+
+            def timed_poll():
+                start = perf_counter()
+                try:
+                    poll()
+                finally:
+                    self.record(name, perf_counter() - start)
+
+            # Instance attribute shadows the method, only within the harness.
+            target.poll = timed_poll
+
+            return None
+
+        def timed_submit(source):
+            start = perf_counter()
+            future = submit(source)
+            future.add_done_callback(lambda f: self.record(name, perf_counter() - start))
+            return future
+
+        return timed_submit
+
+    def get_cycles(self):
+        with self.__lock:
+            return dict((k, list(v)) for k, v in self.__cycles.items())
+
+
+class StalenessTracker(object):
+    __PREFIXES = ('ticker_bbo_', 'ticker_mid_', 'ticker_ltp_')
+
+    def __init__(self, url):
+        self.__url = url
+        self.__values = {}
+        self.__changed = {}
+        self.__samples = []
+
+    def sample(self):
+        now = time()
+
+        text = urlopen(self.__url).read().decode()
+
+        for line in text.splitlines():
+
+            # Polled prices only, the ages, counters and consolidated venues are not quotes.
+            if not line.startswith(self.__PREFIXES):
+                continue
+
+            key, value = line.rsplit(' ', 1)
+
+            if key not in self.__values or self.__values[key] != value:
+                self.__values[key] = value
+                self.__changed[key] = now
+
+            if value != 'NaN':
+                self.__samples.append(now - self.__changed[key])
+
+    def get_samples(self):
+        return sorted(self.__samples)
+
+
+def percentile(values, ratio):
+    return values[min(int(len(values) * ratio), len(values) - 1)] if len(values) > 0 else float('nan')
+
+
+def main():
+    p = standin.parser()
+    p.description = 'End-to-end benchmark of cryptotheus.main against the local stand-in.'
+    p.add_argument('--duration', type=float, default=60.0)
+    p.add_argument('--interval', type=float, default=5.0, help='Polling interval of all the sources.')
+    p.add_argument('--engine', default='thread', choices=['thread', 'asyncio'])
+    p.add_argument('--metric-port', type=int, default=18001)
+    p.add_argument('--max-staleness', type=float, default=None, help='Fail if the p99 staleness exceeds.')
+    p.add_argument('--stream', action='store_true', help='Stream the bitFlyer ticker from the WebSocket stand-in.')
+    p.add_argument('--rate-limit', action='store_true', help='Keep the default rate limits against the stand-in.')
+    p.add_argument('--only', default=None, help='Comma-separated sites or site:role to load.')
+    standin_ws.parser(p)
+    args = p.parse_args()
+
+    server = Process(target=standin.serve, args=(args,), daemon=True)
+    server.start()
+
+    streamer = Process(target=standin_ws.serve, args=(args,), daemon=True) if args.stream else None
+
+    if streamer is not None:
+        streamer.start()
+
+    # The defaults are read at import time, so the environment has to be set before.
+    environ.update(standin.environment(args.host, args.port))
+
+    if streamer is not None:
+        environ.update(standin_ws.environment(args.ws_host, args.ws_port))
+    environ['metric_port'] = str(args.metric_port)
+
+    for prefix in ['bitfinex', 'bitflyer', 'bitmex', 'coincheck', 'oanda', 'poloniex', 'quoine', 'zaif']:
+        environ[prefix + '_interval'] = str(args.interval)
+
+        if not args.rate_limit:
+            environ[prefix + '_public_rate'] = 'none'
+            environ[prefix + '_private_rate'] = 'none'
+
+    import cryptotheus
+    from cryptotheus import launcher
+
+    recorder = CycleRecorder()
+
+    class TimedScheduler(cryptotheus.Scheduler):
+        def add(self, target, submit=None, **kwargs):
+            submit = recorder.wrap(target, submit)
+            return super(TimedScheduler, self).add(target, submit=submit, **kwargs)
+
+    cryptotheus.Scheduler = TimedScheduler
+
+    sleep(0.5)
+
+    usage = getrusage(RUSAGE_SELF)
+    started = time()
+
+    # Blocks until the scheduler terminates.
+    kwargs = {'engine': args.engine, 'only': args.only}
+    thread = Thread(target=launcher.main, kwargs=kwargs)
+    thread.daemon = True
+    thread.start()
+
+    tracker = StalenessTracker('http://localhost:%s/metrics' % args.metric_port)
+
+    while time() - started < args.duration and thread.is_alive():
+
+        sleep(1.0)
+
+        try:
+            tracker.sample()
+        except Exception as e:
+            # Not listening yet, counted as stale until it is.
+            print('sample failure : %s' % e)
+
+    elapsed = time() - started
+    finished = getrusage(RUSAGE_SELF)
+    cpu = (finished.ru_utime - usage.ru_utime) + (finished.ru_stime - usage.ru_stime)
+
+    print('%-20s %8s %10s %10s %10s' % ('job', 'cycles', 'p50(ms)', 'p99(ms)', 'max(ms)'))
+
+    for name, cycles in sorted(recorder.get_cycles().items()):
+        cycles.sort()
+        print('%-20s %8d %10.1f %10.1f %10.1f' % (name, len(cycles), percentile(cycles, 0.5) * 1e3,
+                                                  percentile(cycles, 0.99) * 1e3, cycles[-1] * 1e3))
+
+    staleness = tracker.get_samples()
+    print('staleness p50=%.2fs p99=%.2fs max=%.2fs' % (
+        percentile(staleness, 0.5), percentile(staleness, 0.99), staleness[-1] if staleness else float('nan')))
+    print('cpu=%.2fs (%.1f%% of %.1fs)' % (cpu, cpu * 100 / elapsed, elapsed))
+
+    failures = []
+
+    if not thread.is_alive():
+        failures.append('launcher terminated')
+
+    if len(staleness) == 0:
+        failures.append('no staleness samples')
+    elif args.max_staleness is not None and percentile(staleness, 0.99) > args.max_staleness:
+        failures.append('p99 staleness over %.2fs' % args.max_staleness)
+
+    for failure in failures:
+        print('FAILED : %s' % failure)
+
+    stdout.flush()
+
+    # The stand-ins, and the workers spawned by the launcher if sharded.
+    for process in active_children():
+        process.terminate()
+
+    # The pollers are non-daemon threads, which never terminate by themselves.
+    _exit(1 if len(failures) > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
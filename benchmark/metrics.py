@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from itertools import cycle
+from os import sysconf
+from subprocess import check_output
+from sys import executable
+from time import perf_counter
+
+from prometheus_client import REGISTRY, generate_latest
+
+from cryptotheus.context import AccountType, CryptotheusContext, ProductType, UnitType
+
+SCALES = [10, 100, 1000, 10000]
+
+
+def rss():
+    # Resident set size in bytes. (Linux)
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * sysconf('SC_PAGE_SIZE')
+
+
+def percentile(values, ratio):
+    return values[min(int(len(values) * ratio), len(values) - 1)]
+
+
+def measure(name, series, function, arguments, repeat):
+    latencies = []
+
+    start = perf_counter()
+
+    for _ in range(repeat):
+        for args in arguments:
+            t = perf_counter()
+            function(*args)
+            latencies.append(perf_counter() - t)
+
+    elapsed = perf_counter() - start
+
+    latencies.sort()
+
+    return '%-16s series=%-6d ops/s=%-12.0f p50=%-10.2f p99=%-10.2f (us)' % (
+        name, series, len(latencies) / elapsed, percentile(latencies, 0.50) * 1e6, percentile(latencies, 0.99) * 1e6
+    )
+
+
+def targets(series):
+    products = list(ProductType)
+    sites = max(series // 100, 1)
+
+    # Synthetic (site, product, code) triplets, spread across all the products.
+    return [('site%03d' % (i % sites), products[i % len(products)], 'code%05d' % i) for i in range(series)]
+
+
+def prices(base):
+    # Endless '101.00', '101.01', ... as decoded from the JSON payloads. Cycled over a prime number of values,
+    # so that each series is given a different value on every round.
+    values = ['%.2f' % (base + i * 0.01) for i in range(997)]
+    return cycle(values)
+
+
+def run(series, repeat, collector):
+    context = CryptotheusContext(collector=collector, board_capacity=series)
+
+    if context.get_snapshot() is not None:
+        REGISTRY.register(context.get_snapshot())
+
+    synthetic = targets(series)
+
+    rss_start = rss()
+
+    gauges = [(context.get_ticker_gauges(site, product), code) for site, product, code in synthetic]
+
+    for g, code in gauges:
+        g.register(code)
+
+    accounts = [context.get_account_gauges(site, AccountType.BALANCE, UnitType.JPY) for site, p, c in synthetic]
+
+    for index, g in enumerate(accounts):
+        g.update_value('cash', 'code%05d' % index, 0.0)
+
+    rss_end = rss()
+
+    # Values changing on every update, so that the writes are measured instead of the skips of the unchanged values.
+    asks = prices(101.0)
+    bids = prices(99.0)
+    ltps = prices(100.0)
+
+    results = [
+        measure('get_ticker', series, context.get_ticker_gauges, [(s, p) for s, p, c in synthetic], repeat),
+        measure('update_bbo', series, lambda g, c: g.update_bbo(c, next(asks), next(bids)), gauges, repeat),
+        measure('update_ltp', series, lambda g, c: g.update_ltp(c, next(ltps)), gauges, repeat),
+        measure('update_value', series,
+                lambda g, i: g.update_value('cash', 'code%05d' % i, 1.0), [(g, i) for i, g in enumerate(accounts)],
+                repeat),
+        measure('render', series, generate_latest, [(REGISTRY,)], max(repeat // 3, 3)),
+        '%-16s series=%-6d bytes=%-12.0f' % ('rss/series', series, (rss_end - rss_start) / series),
+    ]
+
+    for result in results:
+        print(result)
+
+
+def main():
+    parser = ArgumentParser(description='Micro-benchmark of the context and gauge layer.')
+    parser.add_argument('--series', type=int, nargs='*', default=SCALES)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--collector', default='gauge', choices=['gauge', 'snapshot'])
+    parser.add_argument('--single', action='store_true', help='Run in the current process.')
+    args = parser.parse_args()
+
+    if args.single:
+
+        for series in args.series:
+            run(series, args.repeat, args.collector)
+
+        return
+
+    # Each scale runs in a fresh process, since the metrics are registered globally.
+    for series in args.series:
+        command = [executable, '-m', 'benchmark.metrics', '--single', '--collector', args.collector,
+                   '--series', str(series), '--repeat', str(args.repeat)]
+        print(check_output(command).decode(), end='')
+
+
+if __name__ == '__main__':
+    main()
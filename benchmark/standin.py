@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from random import Random
+from threading import Lock
+from time import sleep, time
+from urllib.parse import parse_qs, urlparse
+from zlib import crc32
+
+# Starting prices per product (cf: ProductType), consistent across the venues and with each other.
+# (e.g. JPY_BTC = JPY_USD * USD_BTC)
+PRICES = {
+    'JPY_BTC': 990000.0,
+    'USD_BTC': 9000.0,
+    'BTC_BCH': 0.1,
+    'BTC_ETH': 0.05,
+    'JPY_USD': 110.0,
+    'JPY_EUR': 130.0,
+}
+
+BITFLYER = {
+    'BTC_JPY': 'JPY_BTC',
+    'FX_BTC_JPY': 'JPY_BTC',
+    'BTCJPY_MAT1WK': 'JPY_BTC',
+    'BTCJPY_MAT2WK': 'JPY_BTC',
+    'BCH_BTC': 'BTC_BCH',
+    'ETH_BTC': 'BTC_ETH',
+}
+
+BITMEX = {
+    'XBTUSD': 'USD_BTC',
+    'XBTZ17': 'USD_BTC',
+    'XBJZ17': 'JPY_BTC',
+    'ETHZ17': 'BTC_ETH',
+}
+
+
+def lookup(products, code):
+    return products[code] if code in products else None
+
+
+class Market(object):
+    def __init__(self, seed=0, freeze=0.0):
+        self.__lock = Lock()
+        self.__random = Random(seed)
+        self.__freeze = float(freeze)
+        self.__prices = {}
+        self.__quotes = {}
+
+    def quote(self, code, product=None):
+        # Random walk per product, shared by the venues quoting it, so that each poll observes a fresh value.
+        with self.__lock:
+
+            # Quiet market : unchanged quotes at the given ratio.
+            if code in self.__quotes and self.__random.random() < self.__freeze:
+                return self.__quotes[code]
+
+            key = product if product is not None else code
+            initial = PRICES[product] if product in PRICES else 100.0
+            price = self.__prices[key] if key in self.__prices else initial
+            # Small steps, so that the drift between the polls of the venues stays within the spread.
+            price = price * (1 + self.__random.gauss(0, 0.00005))
+            self.__prices[key] = price
+
+            # Constant basis per venue, within the half spread, so that the books across the venues never cross.
+            price = price * (1 + (crc32(code.encode()) % 5 - 2) * 0.0001)
+            spread = price * 0.0005
+            self.__quotes[code] = price + spread, price - spread, price
+            return self.__quotes[code]
+
+    def uniform(self, low, high):
+        with self.__lock:
+            return self.__random.uniform(low, high)
+
+
+class Executions(object):
+    def __init__(self, count, period=60.0):
+        self.__count = int(count)
+        self.__period = float(period)
+        self.__origin = time()
+
+    def rows(self, now):
+        # One execution per period, ids increasing with time.
+        latest = int((now - self.__origin) / self.__period) + self.__count
+        for i in range(latest, 0, -1):
+            yield i, self.__origin + (i - self.__count) * self.__period
+
+    @staticmethod
+    def iso(timestamp):
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, payload=100, error_rate=0.0, hang_rate=0.0, hang=30.0,
+                 executions=1000, freeze=0.0, seed=0):
+        super(StandinServer, self).__init__(address, StandinHandler)
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.payload = int(payload)
+        self.error_rate = float(error_rate)
+        self.hang_rate = float(hang_rate)
+        self.hang = float(hang)
+        self.market = Market(seed, freeze)
+        self.executions = Executions(executions)
+        self.requests = 0
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+
+        delay = server.latency + (server.market.uniform(0, server.jitter) if server.jitter > 0 else 0.0)
+
+        if delay > 0:
+            sleep(delay)
+
+        if server.hang_rate > 0 and server.market.uniform(0, 1) < server.hang_rate:
+            # Hung connection : no response, then dropped.
+            sleep(server.hang)
+            self.close_connection = True
+            return
+
+        if server.error_rate > 0 and server.market.uniform(0, 1) < server.error_rate:
+            return self.__reply(500, {'error': 'stand-in failure'})
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        for prefix, route in ROUTES:
+            if url.path.startswith(prefix):
+                return self.__reply(200, route(server, url.path[len(prefix):], query))
+
+        return self.__reply(404, {'error': 'not found : ' + url.path})
+
+    def __reply(self, status, body):
+        data = dumps(body).encode()
+        etag = '"%08x"' % crc32(data)
+
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, data = 304, b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _param(query, key, default=None):
+    return query[key][0] if key in query else default
+
+
+POLONIEX = {
+    'USDT_BTC': 'USD_BTC',
+    'BTC_BCH': 'BTC_BCH',
+    'BTC_ETH': 'BTC_ETH',
+}
+
+QUOINE = {
+    'BTCJPY': 'JPY_BTC',
+    'BTCUSD': 'USD_BTC',
+    'ETHBTC': 'BTC_ETH',
+}
+
+OANDA = {
+    'USD_JPY': 'JPY_USD',
+    'EUR_JPY': 'JPY_EUR',
+}
+
+BITFINEX = {
+    'btcusd': 'USD_BTC',
+    'bchbtc': 'BTC_BCH',
+    'ethbtc': 'BTC_ETH',
+}
+
+ZAIF = {
+    'btc_jpy': 'JPY_BTC',
+    'bch_btc': 'BTC_BCH',
+    'eth_btc': 'BTC_ETH',
+}
+
+# Single pair, without the code in the path.
+COINCHECK = {
+    '': 'JPY_BTC',
+}
+
+
+def bitflyer_ticker(server, path, query):
+    code = _param(query, 'product_code', 'BTC_JPY')
+    ask, bid, ltp = server.market.quote('bitflyer:' + code, lookup(BITFLYER, code))
+    return {'product_code': code, 'best_ask': ask, 'best_bid': bid, 'ltp': ltp,
+            'timestamp': Executions.iso(time())[:-1]}
+
+
+def bitflyer_private(server, path, query):
+    if path == 'getbalance' or path == 'getcollateralaccounts':
+        return [{'currency_code': c, 'amount': 1.0} for c in ['JPY', 'BTC', 'ETH', 'BCH']]
+
+    if path == 'getcollateral':
+        return {'collateral': 100000.0, 'open_position_pnl': 0.0, 'require_collateral': 0.0}
+
+    if path == 'getpositions':
+        return [{'side': 'BUY', 'size': 0.01, 'pnl': 10.0}]
+
+    if path == 'getexecutions':
+        count = int(_param(query, 'count', 100))
+        after = int(_param(query, 'after', 0))
+        before = int(_param(query, 'before', 2 ** 62))
+        result = []
+        for i, t in server.executions.rows(time()):
+            if len(result) >= count or i <= after:
+                break
+            if i < before:
+                result.append({'id': i, 'price': PRICES['JPY_BTC'], 'size': 0.01,
+                               'exec_date': Executions.iso(t)[:-1]})
+        return result
+
+    return {}
+
+
+def bitmex_instrument(server, path, query):
+    if path == 'activeIntervals':
+        return {'intervals': ['XBT:perpetual', 'XBT:quarterly', 'XBJ:quarterly', 'ETH:quarterly'],
+                'symbols': ['XBTUSD', 'XBTZ17', 'XBJZ17', 'ETHZ17']}
+
+    instruments = []
+
+    for symbol in ['XBTUSD', 'XBTZ17', 'XBJZ17', 'ETHZ17']:
+        ask, bid, ltp = server.market.quote('bitmex:' + symbol, lookup(BITMEX, symbol))
+        instruments.append({'symbol': symbol, 'askPrice': ask, 'bidPrice': bid, 'midPrice': (ask + bid) / 2,
+                            'lastPrice': ltp, 'referenceSymbol': '.' + symbol[:3], 'state': 'Open'})
+        instruments.append({'symbol': '.' + symbol[:3], 'markPrice': ltp, 'referenceSymbol': '.' + symbol[:3],
+                            'state': 'Unlisted'})
+
+    # Padding, to emulate the size of the real payload.
+    for i in range(server.payload):
+        instruments.append({'symbol': 'PAD%05d' % i, 'lastPrice': 1.0, 'state': 'Open'})
+
+    return instruments
+
+
+def bitmex_private(server, path, query):
+    if path.startswith('user/margin'):
+        return [{'currency': 'XBt', 'walletBalance': 100000000, 'unrealisedPnl': 0, 'excessMargin': 100000000}]
+
+    if path.startswith('position'):
+        return [{'symbol': 'XBTUSD', 'currentQty': 100, 'realisedPnl': 0, 'unrealisedPnl': 0}]
+
+    if path.startswith('execution/tradeHistory'):
+        count = int(_param(query, 'count', 100))
+        start = _param(query, 'startTime')
+        end = _param(query, 'endTime')
+        result = []
+        for i, t in server.executions.rows(time()):
+            stamp = Executions.iso(t)
+            if len(result) >= count or (start is not None and stamp < start):
+                break
+            if end is None or stamp <= end:
+                result.append({'execID': 'exec-%d' % i, 'transactTime': stamp, 'lastQty': 100})
+        return result
+
+    return []
+
+
+def poloniex(server, path, query):
+    tickers = {}
+
+    for code, product in POLONIEX.items():
+        ask, bid, ltp = server.market.quote('poloniex:' + code, product)
+        tickers[code] = {'lowestAsk': str(ask), 'highestBid': str(bid), 'last': str(ltp)}
+
+    for i in range(server.payload):
+        tickers['PAD_%05d' % i] = {'lowestAsk': '1.0', 'highestBid': '1.0', 'last': '1.0'}
+
+    return tickers
+
+
+def quoine(server, path, query):
+    products = [{'currency_pair_code': 'PAD%05d' % i, 'market_ask': 1.0, 'market_bid': 1.0,
+                 'last_traded_price': 1.0} for i in range(server.payload)]
+
+    for code, product in QUOINE.items():
+        ask, bid, ltp = server.market.quote('quoine:' + code, product)
+        products.append({'currency_pair_code': code, 'market_ask': ask, 'market_bid': bid, 'last_traded_price': ltp})
+
+    return products
+
+
+def oanda(server, path, query):
+    prices = []
+
+    for code in _param(query, 'instruments', '').split(','):
+        ask, bid, ltp = server.market.quote('oanda:' + code, lookup(OANDA, code))
+        prices.append({'instrument': code, 'ask': ask, 'bid': bid, 'status': 'tradeable'})
+
+    return {'prices': prices}
+
+
+def simple(site, last, products):
+    def route(server, path, query):
+        ask, bid, ltp = server.market.quote(site + ':' + path, lookup(products, path))
+        return {'ask': ask, 'bid': bid, 'mid': (ask + bid) / 2, last: ltp}
+
+    return route
+
+
+ROUTES = [
+    ('/v1/ticker', bitflyer_ticker),
+    ('/v1/me/', bitflyer_private),
+    ('/api/v1/instrument/', bitmex_instrument),
+    ('/api/v1/', bitmex_private),
+    ('/public', poloniex),
+    ('/products', quoine),
+    ('/v1/prices', oanda),
+    ('/v1/pubticker/', simple('bitfinex', 'last_price', BITFINEX)),
+    ('/api/1/ticker/', simple('zaif', 'last', ZAIF)),
+    ('/api/ticker', simple('coincheck', 'last', COINCHECK)),
+]
+
+
+def environment(host, port):
+    # Endpoint overrides, pointing every module to the stand-in.
+    base = 'http://%s:%s' % (host, port)
+
+    return {
+        'bitflyer_endpoint': base,
+        'bitmex_endpoint': base,
+        'bitfinex_endpoint': base + '/v1/pubticker/',
+        'coincheck_endpoint': base + '/api/ticker',
+        'oanda_endpoint': base + '/v1/prices?instruments=',
+        'poloniex_endpoint': base + '/public?command=returnTicker',
+        'quoine_endpoint': base + '/products',
+        'zaif_endpoint': base + '/api/1/ticker/',
+        'bitflyer_apikey': 'standin',
+        'bitflyer_secret': 'standin',
+        'bitmex_apikey': 'standin',
+        'bitmex_secret': 'standin',
+        'oanda_token': 'standin',
+    }
+
+
+def parser():
+    p = ArgumentParser(description='Local stand-in for the exchange endpoints.')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=18000)
+    p.add_argument('--latency', type=float, default=0.0, help='Base latency in seconds.')
+    p.add_argument('--jitter', type=float, default=0.0, help='Additional uniform latency in seconds.')
+    p.add_argument('--payload', type=int, default=100, help='Padding entries in the bulk payloads.')
+    p.add_argument('--error-rate', type=float, default=0.0, help='Ratio of HTTP 500 responses.')
+    p.add_argument('--hang-rate', type=float, default=0.0, help='Ratio of hung connections.')
+    p.add_argument('--hang', type=float, default=30.0, help='Seconds to hang before dropping the connection.')
+    p.add_argument('--executions', type=int, default=1000, help='Private executions in the history.')
+    p.add_argument('--freeze', type=float, default=0.0, help='Ratio of the unchanged quotes per poll.')
+    return p
+
+
+def serve(args):
+    server = StandinServer((args.host, args.port), latency=args.latency, jitter=args.jitter, payload=args.payload,
+                           error_rate=args.error_rate, hang_rate=args.hang_rate, hang=args.hang,
+                           executions=args.executions, freeze=args.freeze)
+    server.serve_forever()
+
+
+def main():
+    args = parser().parse_args()
+
+    for key, value in sorted(environment(args.host, args.port).items()):
+        print('export %s="%s"' % (key, value))
+
+    serve(args)
+
+
+if __name__ == '__main__':
+    main()
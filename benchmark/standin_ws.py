@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from asyncio import CancelledError, ensure_future, sleep
+from json import dumps
+from time import time
+
+from benchmark.standin import BITFLYER, BITMEX, Executions, Market, bitmex_instrument, lookup
+
+
+class StandinStream(object):
+    def __init__(self, interval=0.1, drop_after=0.0, payload=100, seed=0):
+        self.interval = float(interval)
+        self.drop_after = float(drop_after)
+        self.payload = int(payload)
+        self.market = Market(seed)
+        self.connections = 0
+
+    async def handle(self, request):
+
+        # Optional dependency, only required by the streaming mode.
+        from aiohttp import WSMsgType, web
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        self.connections += 1
+
+        channels = set()
+        started = time()
+
+        pusher = ensure_future(self.push(ws, channels, started))
+
+        try:
+
+            async for message in ws:
+
+                if message.type != WSMsgType.TEXT:
+                    continue
+
+                json = message.json()
+
+                if json.get('method') == 'subscribe':
+                    # bitFlyer : JSON-RPC
+                    channels.add(json['params']['channel'])
+                    await ws.send_str(dumps({'jsonrpc': '2.0', 'id': json.get('id'), 'result': True}))
+
+                if json.get('op') == 'subscribe':
+                    # BitMEX : table snapshot, then the deltas.
+                    for topic in json['args']:
+                        channels.add(topic)
+                        await ws.send_str(dumps({'success': True, 'subscribe': topic}))
+                        await ws.send_str(dumps({'table': topic, 'action': 'partial', 'keys': ['symbol'],
+                                                 'data': bitmex_instrument(self, 'activeAndIndices', {})}))
+
+        finally:
+
+            pusher.cancel()
+
+        return ws
+
+    async def push(self, ws, channels, started):
+
+        try:
+
+            while not ws.closed:
+
+                if 0 < self.drop_after < time() - started:
+                    # Simulated drop, the client is expected to reconnect and resubscribe.
+                    await ws.close()
+                    break
+
+                for channel in list(channels):
+                    await ws.send_str(dumps(self.message(channel)))
+
+                await sleep(self.interval)
+
+        except CancelledError:
+            pass
+
+    def message(self, channel):
+
+        if channel == 'instrument':
+            return {'table': 'instrument', 'action': 'update', 'data': self.instruments()}
+
+        return {'jsonrpc': '2.0', 'method': 'channelMessage', 'params': {
+            'channel': channel, 'message': self.ticker(channel)}}
+
+    def instruments(self):
+        updates = []
+
+        # Partial rows, only with the changed fields.
+        for symbol in ['XBTUSD', 'XBTZ17', 'XBJZ17', 'ETHZ17']:
+            ask, bid, ltp = self.market.quote('bitmex:' + symbol, lookup(BITMEX, symbol))
+            updates.append({'symbol': symbol, 'askPrice': ask, 'bidPrice': bid, 'midPrice': (ask + bid) / 2})
+            updates.append({'symbol': '.' + symbol[:3], 'markPrice': ltp})
+
+        return updates
+
+    def ticker(self, channel):
+        code = channel[len('lightning_ticker_'):]
+        ask, bid, ltp = self.market.quote('bitflyer:' + code, lookup(BITFLYER, code))
+        return {'product_code': code, 'best_ask': ask, 'best_bid': bid, 'ltp': ltp,
+                'timestamp': Executions.iso(time())[:-1]}
+
+
+def environment(host, port):
+    return {
+        'bitflyer_stream': 'true',
+        'bitflyer_stream_endpoint': 'ws://%s:%s/json-rpc' % (host, port),
+        'bitmex_stream': 'true',
+        'bitmex_stream_endpoint': 'ws://%s:%s/realtime' % (host, port),
+    }
+
+
+def parser(p=None):
+    p = p if p is not None else ArgumentParser(description='Local stand-in for the exchange WebSocket endpoints.')
+    p.add_argument('--ws-host', default='127.0.0.1')
+    p.add_argument('--ws-port', type=int, default=18002)
+    p.add_argument('--ws-interval', type=float, default=0.1, help='Seconds between the pushes per channel.')
+    p.add_argument('--ws-drop-after', type=float, default=0.0, help='Drop each connection after seconds.')
+    return p
+
+
+def serve(args):
+    from aiohttp import web
+
+    stream = StandinStream(interval=args.ws_interval, drop_after=args.ws_drop_after,
+                           payload=getattr(args, 'payload', 100))
+
+    app = web.Application()
+    app.router.add_get('/json-rpc', stream.handle)
+    app.router.add_get('/realtime', stream.handle)
+
+    web.run_app(app, host=args.ws_host, port=args.ws_port, print=None, handle_signals=False)
+
+
+def main():
+    args = parser().parse_args()
+
+    for key, value in sorted(environment(args.ws_host, args.ws_port).items()):
+        print('export %s="%s"' % (key, value))
+
+    serve(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,12 @@
 #!/usr/bin/env python
 
-import cryptotheus
-
-
-def main():
-    context = cryptotheus.Context()
-    context.launch_server()
-
-    cryptotheus.BitfinexTicker(context).start()
-    cryptotheus.BitflyerTicker(context).start()
-    cryptotheus.BitmexTicker(context).start()
-    cryptotheus.CoincheckTicker(context).start()
-    cryptotheus.OandaTicker(context).start()
-    cryptotheus.PoloniexTicker(context).start()
-    cryptotheus.QuoineTicker(context).start()
-    cryptotheus.ZaifTicker(context).start()
-
-    cryptotheus.BitflyerAccount(context).start()
-    cryptotheus.BitmexAccount(context).start()
+from argparse import ArgumentParser
+from os import getenv
 
+from cryptotheus import launcher
 
 if __name__ == '__main__':
-    main()
+    p = ArgumentParser(description='Exports the exchange tickers and accounts as the prometheus metrics.')
+    p.add_argument('--only', default=getenv('cryptotheus_only', None),
+                   help='Comma-separated sites or site:role to load. (e.g. bitflyer,bitmex:ticker)')
+    launcher.main(only=p.parse_args().only)
@@ -1,25 +1,57 @@
-from cryptotheus import account_bitflyer
-from cryptotheus import account_bitmex
-from cryptotheus import context
-from cryptotheus import ticker_bitfinex
-from cryptotheus import ticker_bitflyer
-from cryptotheus import ticker_bitmex
-from cryptotheus import ticker_coincheck
-from cryptotheus import ticker_oanda
-from cryptotheus import ticker_poloniex
-from cryptotheus import ticker_quoine
-from cryptotheus import ticker_zaif
-
-Context = context.CryptotheusContext
-
-BitfinexTicker = ticker_bitfinex.BitfinexTicker
-BitflyerTicker = ticker_bitflyer.BitflyerTicker
-BitmexTicker = ticker_bitmex.BitmexTicker
-CoincheckTicker = ticker_coincheck.CoincheckTicker
-OandaTicker = ticker_oanda.OandaTicker
-PoloniexTicker = ticker_poloniex.PoloniexTicker
-QuoineTicker = ticker_quoine.QuoineTicker
-ZaifTicker = ticker_zaif.ZaifTicker
-
-BitflyerAccount = account_bitflyer.BitflyerAccount
-BitmexAccount = account_bitmex.BitmexAccount
+from importlib import import_module
+
+from cryptotheus import registry
+
+Registry = registry.Registry
+
+# Alias -> (module, attribute), imported on the first access only. (cf: Registry for the sites)
+_ALIASES = {
+    'Context': ('context', 'CryptotheusContext'),
+    'ConsolidatedBook': ('consolidated', 'ConsolidatedBook'),
+    'ConversionGraph': ('conversion', 'ConversionGraph'),
+    'DerivedMetrics': ('derived', 'DerivedMetrics'),
+
+    'AsyncEngine': ('engine', 'AsyncEngine'),
+    'Scheduler': ('scheduler', 'Scheduler'),
+
+    'TickRecorder': ('recorder', 'TickRecorder'),
+    'TickReader': ('recorder', 'TickReader'),
+    'AdaptiveInterval': ('adaptive', 'AdaptiveInterval'),
+
+    'ShardCollector': ('shard', 'ShardCollector'),
+    'ShardSupervisor': ('shard', 'ShardSupervisor'),
+    'start_aggregate_server': ('shard', 'start_aggregate_server'),
+
+    'BitflyerStream': ('stream_bitflyer', 'BitflyerStream'),
+    'BitmexStream': ('stream_bitmex', 'BitmexStream'),
+
+    'BitfinexTicker': ('ticker_bitfinex', 'BitfinexTicker'),
+    'BitflyerTicker': ('ticker_bitflyer', 'BitflyerTicker'),
+    'BitmexTicker': ('ticker_bitmex', 'BitmexTicker'),
+    'CoincheckTicker': ('ticker_coincheck', 'CoincheckTicker'),
+    'OandaTicker': ('ticker_oanda', 'OandaTicker'),
+    'PoloniexTicker': ('ticker_poloniex', 'PoloniexTicker'),
+    'QuoineTicker': ('ticker_quoine', 'QuoineTicker'),
+    'ZaifTicker': ('ticker_zaif', 'ZaifTicker'),
+
+    'BitflyerAccount': ('account_bitflyer', 'BitflyerAccount'),
+    'BitmexAccount': ('account_bitmex', 'BitmexAccount'),
+}
+
+
+def __getattr__(name):
+    if name not in _ALIASES:
+        raise AttributeError("module 'cryptotheus' has no attribute '%s'" % name)
+
+    module, attribute = _ALIASES[name]
+
+    value = getattr(import_module('cryptotheus.' + module), attribute)
+
+    # Cached on the module, so that the later accesses (and the overrides) bypass this function.
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_ALIASES.keys()))
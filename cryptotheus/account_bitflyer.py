@@ -1,16 +1,16 @@
-from datetime import timedelta, datetime
-from hashlib import sha256
-from hmac import new
+from datetime import timedelta
 from os import getenv
 from threading import Thread
-from time import sleep, time
+from time import time
 
-from requests import request
+from cryptotheus.context import AccountType, UnitType, CryptotheusContext
+from cryptotheus.limiter import Priority
+from cryptotheus.scheduler import Scheduler
+from cryptotheus.signer import HmacSigner
+from cryptotheus.volume import VolumeAggregator, parse_timestamp
 
-from cryptotheus.context import AccountType, UnitType, ProductType, CryptotheusContext
 
-
-class BitflyerAccount(Thread):
+class BitflyerAccount(object):
     __LABEL_CASH = 'cash'
     __LABEL_MARGIN = 'margin'
     __LABEL_COLLATERAL = 'collateral'
@@ -19,9 +19,9 @@ class BitflyerAccount(Thread):
                  endpoint=getenv('bitflyer_endpoint', 'https://api.bitflyer.jp'),
                  interval=getenv('bitflyer_interval', 30),
                  key=getenv('bitflyer_apikey', None),
-                 secret=getenv('bitflyer_secret', None)
+                 secret=getenv('bitflyer_secret', None),
+                 buckets=getenv('volume_buckets', 720)
                  ):
-        super(BitflyerAccount, self).__init__()
         self.__site = 'bitflyer'
         self.__balances = {
             'JPY': UnitType.JPY,
@@ -58,30 +58,34 @@ class BitflyerAccount(Thread):
         self.__log.info('endpoint=[%s] interval=[%s] key=[%s]', endpoint, interval, key)
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
         self.__key = key
         self.__secret = secret
+        self.__signer = HmacSigner(secret) if secret is not None else None
+        self.__conversions = context.get_conversions()
+        self.__volumes = {}
+        for code in self.__products.keys():
+            self.__volumes[code] = VolumeAggregator(self.__intervals, buckets=buckets,
+                                                    journal=context.get_journal(), site=self.__site, product=code)
 
-    def run(self):
-
-        while self.__context.is_active():
+    def get_interval(self):
+        return self.__interval
 
-            # Sleep first, to cache the prices
-            sleep(self.__interval)
+    def poll(self):
 
-            threads = [
-                Thread(daemon=True, target=self._fetch_balance),
-                Thread(daemon=True, target=self._fetch_collateral),
-                Thread(daemon=True, target=self._fetch_collateral_account),
-                Thread(daemon=True, target=self._fetch_margin),
-                Thread(daemon=True, target=self._fetch_execution),
-            ]
+        threads = [
+            Thread(daemon=True, target=self._fetch_balance),
+            Thread(daemon=True, target=self._fetch_collateral),
+            Thread(daemon=True, target=self._fetch_collateral_account),
+            Thread(daemon=True, target=self._fetch_margin),
+            Thread(daemon=True, target=self._fetch_execution),
+        ]
 
-            for t in threads:
-                t.start()
+        for t in threads:
+            t.start()
 
-            for t in threads:
-                t.join()
+        for t in threads:
+            t.join()
 
     def _json_get(self, path, method='GET', body=''):
 
@@ -91,11 +95,16 @@ class BitflyerAccount(Thread):
         if self.__secret is None:
             return None
 
+        session = self.__context.get_session(self.__site)
+
+        # Signed once granted, so that the wait does not stale the timestamp.
+        session.acquire(private=True, priority=Priority.ACCOUNT, deadline=self.__interval)
+
         timestamp = str(int(time()))
 
         data = timestamp + method + path + body
 
-        digest = new(str.encode(self.__secret), str.encode(data), sha256).hexdigest()
+        digest = self.__signer.sign(data)
 
         headers = {
             "ACCESS-KEY": self.__key,
@@ -104,33 +113,7 @@ class BitflyerAccount(Thread):
             "Content-Type": "application/json"
         }
 
-        return request('GET', self.__endpoint + path, headers=headers).json()
-
-    def _to_jpy(self, unit, value):
-
-        if unit == UnitType.JPY:
-            return value
-
-        btc = value if unit == UnitType.BTC else self._to_btc(unit, value)
-
-        rate = self.__context.get_ticker_gauges(self.__site, ProductType.JPY_BTC).get_cached_mid('BTC_JPY')
-
-        return btc * rate if btc is not None and rate is not None else None
-
-    def _to_btc(self, unit, value):
-
-        if unit == UnitType.BTC:
-            return value
-
-        rate = None
-
-        if unit == UnitType.ETH:
-            rate = self.__context.get_ticker_gauges(self.__site, ProductType.BTC_ETH).get_cached_mid('ETH_BTC')
-
-        if unit == UnitType.BCH:
-            rate = self.__context.get_ticker_gauges(self.__site, ProductType.BTC_BCH).get_cached_mid('BCH_BTC')
-
-        return value * rate if value is not None and rate is not None else None
+        return session.get_json(self.__endpoint + path, headers=headers, private=True, acquired=True)
 
     def _fetch_balance(self):
 
@@ -163,12 +146,12 @@ class BitflyerAccount(Thread):
             self.__log.debug('Balance : %s = %s', ccy, value)
 
             if unit != UnitType.JPY:
-                jpy = self._to_jpy(unit, value)
+                jpy = self.__conversions.convert(value, unit, UnitType.JPY)
                 g = self.__context.get_account_gauges(self.__site, AccountType.BALANCE, UnitType.JPY)
                 g.update_value(self.__LABEL_CASH, ccy, jpy)
 
             if unit != UnitType.JPY and unit != UnitType.BTC:
-                btc = self._to_btc(unit, value)
+                btc = self.__conversions.convert(value, unit, UnitType.BTC)
                 g = self.__context.get_account_gauges(self.__site, AccountType.BALANCE, UnitType.BTC)
                 g.update_value(self.__LABEL_CASH, ccy, btc)
 
@@ -229,7 +212,8 @@ class BitflyerAccount(Thread):
 
             if unit != UnitType.JPY:
                 account = self.__context.get_account_gauges(self.__site, AccountType.BALANCE, UnitType.JPY)
-                account.update_value(self.__LABEL_COLLATERAL, ccy, self._to_jpy(unit, value))
+                jpy = self.__conversions.convert(value, unit, UnitType.JPY)
+                account.update_value(self.__LABEL_COLLATERAL, ccy, jpy)
 
     def _fetch_margin(self):
 
@@ -272,25 +256,32 @@ class BitflyerAccount(Thread):
 
     def _fetch_execution(self):
 
-        now = datetime.now()
-
         for code, unit in self.__products.items():
 
             interval_notional = {}
 
             try:
 
+                aggregator = self.__volumes[code]
+
+                latest_id = aggregator.get_cursor()
+
+                maximum_id = latest_id
+
                 minimum_id = None
 
-                notionals = {}
+                cutoff = time() - aggregator.get_horizon()
 
-                for interval in self.__intervals.keys():
-                    notionals[interval] = 0.0
+                executions = []
 
                 while True:
 
                     path = '/v1/me/getexecutions?count=500&product_code=%s' % code
 
+                    # Only fetch the executions newer than the ones already aggregated.
+                    if latest_id is not None:
+                        path = path + '&after=%s' % latest_id
+
                     if minimum_id is not None:
                         path = path + '&before=%s' % minimum_id
 
@@ -312,32 +303,29 @@ class BitflyerAccount(Thread):
                         if 'exec_date' not in execution:
                             continue
 
-                        if minimum_id is None:
-                            minimum_id = execution['id']
-                        else:
-                            minimum_id = min(minimum_id, execution['id'])
-
-                        exec_date = execution['exec_date'][:19] + ' +0000'
+                        exec_id = execution['id']
 
-                        exec_date = datetime.strptime(exec_date, '%Y-%m-%dT%H:%M:%S %z')
+                        minimum_id = exec_id if minimum_id is None else min(minimum_id, exec_id)
 
-                        for interval, delta in self.__intervals.items():
+                        maximum_id = exec_id if maximum_id is None else max(maximum_id, exec_id)
 
-                            if (exec_date + delta).timestamp() < now.timestamp():
-                                continue
+                        exec_time = parse_timestamp(execution['exec_date'])
 
-                            notional = float(execution['price']) * float(execution['size'])
+                        if exec_time < cutoff:
+                            continue
 
-                            notionals[interval] = notionals[interval] + notional
+                        executions.append((exec_id, exec_time, float(execution['price']) * float(execution['size'])))
 
-                            count = count + 1
+                        count = count + 1
 
                     if count == 0:
                         break
 
-                self.__log.debug('Volume : %s - %s' % (code, str(notionals)))
+                aggregator.update(maximum_id, executions)
+
+                interval_notional = aggregator.get_values(time())
 
-                interval_notional = notionals
+                self.__log.debug('Volume : %s - %s (%s new)' % (code, str(interval_notional), len(executions)))
 
             except Exception as e:
 
@@ -348,7 +336,7 @@ class BitflyerAccount(Thread):
                 ccy = self.__context.get_account_gauges(self.__site, AccountType.VOLUME, unit)
                 ccy.update_value(interval, code, notional)
                 jpy = self.__context.get_account_gauges(self.__site, AccountType.VOLUME, UnitType.JPY)
-                jpy.update_value(interval, code, self._to_jpy(unit, notional))
+                jpy.update_value(interval, code, self.__conversions.convert(notional, unit, UnitType.JPY))
 
 
 def main():
@@ -356,7 +344,10 @@ def main():
     context.launch_server()
 
     target = BitflyerAccount(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target, delay=target.get_interval())
+    scheduler.start()
 
 
 if __name__ == '__main__':
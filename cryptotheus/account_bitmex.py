@@ -1,27 +1,27 @@
-from datetime import timedelta, datetime
-from hashlib import sha256
-from hmac import new
+from datetime import timedelta
 from os import getenv
-from threading import Lock
 from threading import Thread
-from time import sleep, time
+from time import time
 from urllib import parse
 
-from requests import request
-
 from cryptotheus.context import AccountType, UnitType, CryptotheusContext
+from cryptotheus.limiter import Priority
+from cryptotheus.scheduler import Scheduler
+from cryptotheus.signer import HmacSigner
+from cryptotheus.volume import VolumeAggregator, parse_timestamp
 
 
-class BitmexAccount(Thread):
+class BitmexAccount(object):
     __SATOSHI = 0.00000001
 
     def __init__(self, context,
                  endpoint=getenv('bitmex_endpoint', 'https://www.bitmex.com'),
                  interval=getenv('bitmex_interval', 30),
                  key=getenv('bitmex_apikey', None),
-                 secret=getenv('bitmex_secret', None)
+                 secret=getenv('bitmex_secret', None),
+                 buckets=getenv('volume_buckets', 720),
+                 expires=getenv('bitmex_expires', 30)
                  ):
-        super(BitmexAccount, self).__init__()
         self.__site = 'bitmex'
         self.__balances = {
             'XBt': UnitType.BTC,
@@ -43,30 +43,45 @@ class BitmexAccount(Thread):
         self.__log.info('endpoint=[%s] interval=[%s] key=[%s]', endpoint, interval, key)
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
         self.__key = key
         self.__secret = secret
-        self.__lock = Lock()
+        self.__signer = HmacSigner(secret) if secret is not None else None
+        self.__expires = float(expires)
+        self.__conversions = context.get_conversions()
+        self.__buckets = buckets
+        self.__volumes = {}
+
+    def get_interval(self):
+        return self.__interval
+
+    def poll(self):
+
+        mappings = self._get_mapping()
 
-    def run(self):
+        if len(mappings) > 0:
 
-        while self.__context.is_active():
+            # Rolled over symbols are no longer fetched, their aggregators are released.
+            symbols = set(mappings.values())
 
-            mappings = self._get_mapping()
+            for symbol in [s for s in self.__volumes.keys() if s not in symbols]:
+                self.__log.info('Execution aggregator released : %s', symbol)
+                del self.__volumes[symbol]
 
-            threads = [
-                Thread(daemon=True, target=self._fetch_collateral),
-                Thread(daemon=True, target=self._fetch_position, args=(mappings,)),
-                Thread(daemon=True, target=self._fetch_execution, args=(mappings,)),
-            ]
+        threads = [
+            Thread(daemon=True, target=self._fetch_collateral),
+            Thread(daemon=True, target=self._fetch_position, args=(mappings,)),
+        ]
 
-            for t in threads:
-                t.start()
+        # Paginated per symbol, concurrently with the other requests.
+        for alias, unit in self.__positions.items():
+            threads.append(Thread(daemon=True, target=self._fetch_execution, args=(mappings, alias, unit)))
 
-            for t in threads:
-                t.join()
+        for t in threads:
+            t.start()
 
-            sleep(self.__interval)
+        for t in threads:
+            t.join()
 
     def _json_get(self, path, method='GET', body=''):
 
@@ -76,26 +91,24 @@ class BitmexAccount(Thread):
         if self.__secret is None:
             return None
 
-        with self.__lock:
-
-            sleep(0.01)
+        session = self.__context.get_session(self.__site)
 
-            timestamp = str(int(time() * 1000))
+        # Signed once granted, so that the wait does not stale the expiry.
+        session.acquire(private=True, priority=Priority.ACCOUNT, deadline=self.__interval)
 
-            data = method + path + timestamp + body
+        # Expiry instead of a nonce, so that the concurrent requests are accepted in any order.
+        expires = str(int(time() + self.__expires))
 
-            digest = new(str.encode(self.__secret), str.encode(data), sha256).hexdigest()
+        digest = self.__signer.sign(method + path + expires + body)
 
-            headers = {
-                "api-key": self.__key,
-                "api-nonce": timestamp,
-                "api-signature": digest,
-                "Accept": "application/json"
-            }
-
-            result = request('GET', self.__endpoint + path, headers=headers).json()
+        headers = {
+            "api-key": self.__key,
+            "api-expires": expires,
+            "api-signature": digest,
+            "Accept": "application/json"
+        }
 
-        return result
+        return session.get_json(self.__endpoint + path, headers=headers, private=True, acquired=True)
 
     def _get_mapping(self):
 
@@ -156,6 +169,12 @@ class BitmexAccount(Thread):
             g.update_value('excess', ccy, exc)
             self.__log.debug('Collateral : deposited = %s, unrealized = %s, excess = %s', val, upl, exc)
 
+            if unit != UnitType.JPY:
+                g = self.__context.get_account_gauges(self.__site, AccountType.COLLATERAL, UnitType.JPY)
+                g.update_value('deposited', ccy, self.__conversions.convert(val, unit, UnitType.JPY))
+                g.update_value('unrealized', ccy, self.__conversions.convert(upl, unit, UnitType.JPY))
+                g.update_value('excess', ccy, self.__conversions.convert(exc, unit, UnitType.JPY))
+
     def _fetch_position(self, mappings):
 
         try:
@@ -208,27 +227,45 @@ class BitmexAccount(Thread):
             self.__log.debug('Position %s (%s) : position = %s, realized = %s, unrealized = %s',
                              alias, symbol, current, realized, unrealized)
 
-    def _fetch_execution(self, mappings):
+    def _fetch_execution(self, mappings, alias, unit):
 
-        now = datetime.now()
+        symbol = mappings[alias] if alias in mappings else None
 
-        for alias, unit in self.__positions.items():
+        quantities = {}
 
-            symbol = mappings[alias] if alias in mappings else None
+        try:
+
+            if symbol is not None:
+
+                aggregator = self.__volumes[symbol] if symbol in self.__volumes else None
+
+                if aggregator is None:
+                    aggregator = VolumeAggregator(self.__intervals, buckets=self.__buckets,
+                                                  journal=self.__context.get_journal(),
+                                                  site=self.__site, product=symbol)
+                    self.__volumes[symbol] = aggregator
+
+                # (transactTime, execIDs) of the newest executions already aggregated.
+                cursor = aggregator.get_cursor()
 
-            end_time = None
+                latest_time = cursor[0] if cursor is not None else None
 
-            quantities = {}
+                latest_ids = set(cursor[1]) if cursor is not None else set()
 
-            for interval in self.__intervals.keys():
-                quantities[interval] = 0.0 if symbol is not None else None
+                cutoff = time() - aggregator.get_horizon()
 
-            try:
+                end_time = None
 
-                while symbol is not None:
+                seen = set(latest_ids)
+
+                executions = []
+
+                while True:
 
                     path = '/api/v1/execution/tradeHistory?count=500&reverse=true&symbol=' + parse.quote(symbol)
 
+                    path = path if latest_time is None else path + '&startTime=' + parse.quote(latest_time)
+
                     path = path if end_time is None else path + '&endTime=' + parse.quote(end_time)
 
                     json = self._json_get(path)
@@ -240,33 +277,57 @@ class BitmexAccount(Thread):
                         if 'transactTime' not in execution or 'lastQty' not in execution:
                             continue
 
-                        quantity = execution['lastQty']
-
                         end_time = execution['transactTime']
 
-                        exec_date = datetime.strptime(end_time[:19] + ' +0000', '%Y-%m-%dT%H:%M:%S %z')
+                        exec_id = execution['execID'] if 'execID' in execution else None
+
+                        if exec_id is None:
+                            # Identified by its own fields instead, so that the same row has the same key every cycle.
+                            order_id = execution['orderID'] if 'orderID' in execution else None
+                            side = execution['side'] if 'side' in execution else None
+                            price = execution['lastPx'] if 'lastPx' in execution else None
+                            exec_id = '%s:%s:%s:%s:%s' % (end_time, order_id, side, price, execution['lastQty'])
+
+                        # Both startTime and endTime are inclusive, skip the boundary rows already counted.
+                        if exec_id in seen:
+                            continue
+
+                        seen.add(exec_id)
 
-                        for interval, delta in self.__intervals.items():
+                        if latest_time is None or end_time > latest_time:
+                            latest_time = end_time
+                            latest_ids = set()
 
-                            if (exec_date + delta).timestamp() < now.timestamp():
-                                continue
+                        if end_time == latest_time:
+                            latest_ids.add(exec_id)
 
-                            quantities[interval] = quantities[interval] + quantity
+                        exec_time = parse_timestamp(end_time)
 
-                            count = count + 1
+                        if exec_time < cutoff:
+                            continue
+
+                        executions.append((exec_id, exec_time, execution['lastQty']))
+
+                        count = count + 1
 
                     if count == 0:
                         break
 
-                self.__log.debug('Execution : %s - %s' % (alias, str(quantities)))
+                cursor = (latest_time, sorted(latest_ids)) if latest_time is not None else None
+
+                aggregator.update(cursor, executions)
 
-            except Exception as e:
+                quantities = aggregator.get_values(time())
 
-                self.__log.warn('Execution Failure : %s - %s', type(e), e.args)
+                self.__log.debug('Execution : %s - %s (%s new)' % (alias, str(quantities), len(executions)))
 
-            for interval in self.__intervals.keys():
-                g = self.__context.get_account_gauges(self.__site, AccountType.VOLUME, unit)
-                g.update_value(interval, alias, quantities[interval])
+        except Exception as e:
+
+            self.__log.warn('Execution Failure : %s - %s', type(e), e.args)
+
+        for interval in self.__intervals.keys():
+            g = self.__context.get_account_gauges(self.__site, AccountType.VOLUME, unit)
+            g.update_value(interval, alias, quantities[interval] if interval in quantities else None)
 
 
 def main():
@@ -274,7 +335,10 @@ def main():
     context.launch_server()
 
     target = BitmexAccount(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target, delay=target.get_interval())
+    scheduler.start()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+from math import isnan
+from os import getenv
+from time import time
+
+
+class AdaptiveInterval(object):
+    # Polls faster while the mid prices move or the spreads widen, slower while nothing changes.
+    # Bounded by [minimum, maximum], and by the rate limits reported by the exchange or the configured budget.
+
+    def __init__(self, context, target, interval,
+                 threshold=getenv('adaptive_threshold', 0.0005),
+                 faster=getenv('adaptive_faster', 0.5),
+                 slower=getenv('adaptive_slower', 1.5)
+                 ):
+        name = target.__class__.__name__
+        site = target.get_site()
+
+        self.__context = context
+        self.__target = target
+        self.__site = site
+        self.__interval = float(interval)
+        self.__minimum = float(getenv(name + '_min_interval', self.__interval / 4))
+        self.__maximum = float(getenv(name + '_max_interval', self.__interval * 4))
+        self.__budget = getenv(site + '_budget', None)
+        self.__threshold = float(threshold)
+        self.__faster = float(faster)
+        self.__slower = float(slower)
+        self.__mids = {}
+        self.__spreads = {}
+
+    def get_interval(self):
+        return self.__interval
+
+    def __observe(self):
+
+        # Largest relative move of the mid and widening of the spread, since the previous cycle.
+        change = 0.0
+        widened = False
+
+        for (site, code), quote in self.__context.get_board().get_quotes().items():
+
+            ask, bid, mid = quote[0], quote[1], quote[2]
+
+            if site != self.__site or isnan(mid) or mid == 0:
+                continue
+
+            last = self.__mids[code] if code in self.__mids else None
+
+            if last is not None:
+                change = max(change, abs(mid - last) / last)
+
+            self.__mids[code] = mid
+
+            if isnan(ask) or isnan(bid):
+                continue
+
+            spread = (ask - bid) / mid
+
+            average = self.__spreads[code] if code in self.__spreads else spread
+
+            widened = widened or spread > average * 1.5
+
+            self.__spreads[code] = average * 0.9 + spread * 0.1
+
+        return change, widened
+
+    def __floor(self):
+
+        floor = self.__minimum
+
+        requests = max(len(self.__target.get_requests()), 1)
+
+        if self.__budget is not None:
+            # Requests per minute, for this source.
+            floor = max(floor, requests * 60.0 / float(self.__budget))
+
+        # Public limits only, the tickers do not consume the private ones of the accounts.
+        limits = self.__context.get_session(self.__site).get_limits(private=False)
+
+        if limits is not None:
+
+            remaining, reset = limits
+
+            if reset is not None and reset > time():
+                # Spread the remaining requests until the reset, shared with the other sources of the site.
+                floor = max(floor, (reset - time()) * requests / max(remaining, 1.0))
+
+        return floor
+
+    def update(self):
+
+        change, widened = self.__observe()
+
+        if change >= self.__threshold or widened:
+            interval = self.__interval * self.__faster
+        elif change == 0:
+            interval = self.__interval * self.__slower
+        else:
+            interval = self.__interval
+
+        # The floor prevails over the maximum, the limits are never exceeded.
+        self.__interval = max(min(interval, self.__maximum), self.__floor())
+
+        return self.__interval
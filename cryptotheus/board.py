@@ -0,0 +1,231 @@
+from contextlib import contextmanager
+from math import nan
+from mmap import mmap
+from os import O_CREAT, O_RDWR, close, fstat, ftruncate, open as os_open
+from struct import Struct
+from threading import Lock
+
+try:
+    from fcntl import LOCK_EX, LOCK_UN, flock
+except ImportError:
+    flock = None
+
+# Header : magic, version, capacity, count
+_HEADER = Struct('<8sIII12x')
+
+# Record : sequence, ask, bid, mid, ltp, exchange timestamp, local timestamp, key ('site:code'), product
+_RECORD = Struct('<Q4ddd64s8s')
+
+_EMPTY = (nan, nan, nan, nan, nan, nan)
+
+_MAGIC = b'CRYPTBRD'
+_VERSION = 2
+
+# Field offsets within a record.
+ASK = 8
+BID = 16
+MID = 24
+LTP = 32
+TIMESTAMP = 40
+UPDATED = 48
+
+
+class PriceBoard(object):
+    # Fixed-layout quotes per (site, code), with seqlock-style consistent reads.
+    # Mapped from a file when a path is given, so that other processes and tools can read the same board.
+
+    def __init__(self, path=None, capacity=4096):
+        self.__path = path
+        self.__lock = Lock()
+        self.__slots = {}
+        self.__found = {}
+        self.__locks = {}
+        self.__scanned = 0
+
+        size = _HEADER.size + int(capacity) * _RECORD.size
+
+        if path is None:
+            self.__fd = None
+            self.__map = mmap(-1, size)
+            _HEADER.pack_into(self.__map, 0, _MAGIC, _VERSION, int(capacity), 0)
+        else:
+            self.__fd = os_open(path, O_RDWR | O_CREAT, 0o644)
+            with self.__file_lock():
+                if fstat(self.__fd).st_size < _HEADER.size:
+                    ftruncate(self.__fd, size)
+                    initialize = True
+                else:
+                    initialize = False
+                # Existing boards keep their own capacity.
+                self.__map = mmap(self.__fd, fstat(self.__fd).st_size)
+                if initialize:
+                    _HEADER.pack_into(self.__map, 0, _MAGIC, _VERSION, int(capacity), 0)
+
+        magic, version, capacity, count = _HEADER.unpack_from(self.__map, 0)
+
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Invalid price board : %s' % path)
+
+        self.__capacity = capacity
+
+        # Word views of the mapping, cheaper than packing per field on the hot path.
+        self.__doubles = memoryview(self.__map).cast('d')
+        self.__sequences = memoryview(self.__map).cast('Q')
+
+    @contextmanager
+    def __file_lock(self):
+
+        # Allocations are serialized across the processes sharing the file.
+        with self.__lock:
+
+            if self.__fd is not None and flock is not None:
+                flock(self.__fd, LOCK_EX)
+
+            try:
+                yield
+            finally:
+                if self.__fd is not None and flock is not None:
+                    flock(self.__fd, LOCK_UN)
+
+    def get_capacity(self):
+        return self.__capacity
+
+    def find(self, site, code):
+
+        key = ('%s:%s' % (site, code)).encode('utf-8')
+
+        slot = self.__slots[key] if key in self.__slots else None
+        slot = self.__found[key] if slot is None and key in self.__found else slot
+
+        if slot is not None:
+            return slot
+
+        # Records allocated by the other processes since the last lookup, indexed once each.
+        count = _HEADER.unpack_from(self.__map, 0)[3]
+
+        for index in range(self.__scanned, count):
+            offset = _HEADER.size + index * _RECORD.size
+            self.__found[_RECORD.unpack_from(self.__map, offset)[7].rstrip(b'\0')] = offset
+            # Atomic, the lock of a record is never replaced once indexed, even by the concurrent lookups.
+            self.__locks.setdefault(offset, Lock())
+
+        self.__scanned = max(self.__scanned, count)
+
+        return self.__found[key] if key in self.__found else None
+
+    def allocate(self, site, code, product=''):
+        # Offset of the record, None once the board is full. (the quote is then only kept on the gauges)
+
+        key = ('%s:%s' % (site, code)).encode('utf-8')
+
+        if len(key) > 64:
+            raise ValueError('Key too long : %s' % key)
+
+        name = product.encode('utf-8')
+
+        if len(name) > 8:
+            raise ValueError('Product too long : %s' % name)
+
+        with self.__file_lock():
+
+            offset = self.find(site, code)
+
+            if offset is not None:
+                self.__slots[key] = offset
+                return offset
+
+            magic, version, capacity, count = _HEADER.unpack_from(self.__map, 0)
+
+            if count >= capacity:
+                return None
+
+            offset = _HEADER.size + count * _RECORD.size
+
+            _RECORD.pack_into(self.__map, offset, 0, nan, nan, nan, nan, nan, nan, key, name)
+            _HEADER.pack_into(self.__map, 0, magic, version, capacity, count + 1)
+
+            self.__slots[key] = offset
+            self.__found[key] = offset
+            self.__locks.setdefault(offset, Lock())
+            self.__scanned = count + 1
+
+        return offset
+
+    def write(self, offset, fields):
+
+        if offset is None:
+            return
+
+        # Writers are serialized per record, readers retry while the sequence is odd or has moved.
+        word = offset >> 3
+
+        with self.__locks[offset]:
+
+            sequence = self.__sequences[word]
+
+            # Left odd by a writer which died mid-write, the record is taken over.
+            sequence = sequence + (sequence & 1)
+
+            self.__sequences[word] = sequence + 1
+
+            for position, value in fields:
+                self.__doubles[word + (position >> 3)] = value
+
+            self.__sequences[word] = sequence + 2
+
+    def read(self, offset, retries=1000):
+
+        if offset is None:
+            return _EMPTY
+
+        for _ in range(retries):
+
+            record = _RECORD.unpack_from(self.__map, offset)
+
+            if record[0] % 2 == 0 and self.__sequences[offset >> 3] == record[0]:
+                return record[1:7]
+
+        # Never completed, e.g. the writer process was killed mid-write.
+        return _EMPTY
+
+    def get_records(self, start=0):
+        # [(offset, site, code, product)] of the shared index, from the start-th record.
+
+        count = _HEADER.unpack_from(self.__map, 0)[3]
+
+        records = []
+
+        for index in range(start, count):
+            offset = _HEADER.size + index * _RECORD.size
+            record = _RECORD.unpack_from(self.__map, offset)
+            site, code = record[7].rstrip(b'\0').decode('utf-8').split(':', 1)
+            records.append((offset, site, code, record[8].rstrip(b'\0').decode('utf-8')))
+
+        return records
+
+    def get_quotes(self, shared=False):
+        # (site, code) -> (ask, bid, mid, ltp, timestamp, updated), optionally including the other processes.
+
+        if shared:
+            count = _HEADER.unpack_from(self.__map, 0)[3]
+            offsets = [_HEADER.size + index * _RECORD.size for index in range(count)]
+        else:
+            offsets = list(self.__slots.values())
+
+        quotes = {}
+
+        for offset in offsets:
+            key = _RECORD.unpack_from(self.__map, offset)[7].rstrip(b'\0').decode('utf-8')
+            site, code = key.split(':', 1)
+            quotes[(site, code)] = self.read(offset)
+
+        return quotes
+
+    def close(self):
+
+        self.__doubles.release()
+        self.__sequences.release()
+        self.__map.close()
+
+        if self.__fd is not None:
+            close(self.__fd)
@@ -0,0 +1,182 @@
+from heapq import heapify, heappop, heappush
+from math import isnan
+from threading import Lock
+from time import time
+
+from prometheus_client.core import GaugeMetricFamily
+
+# Spot venues of all the registered tickers, the derivatives of the same product are not comparable.
+VENUES = ','.join([
+    'bitflyer:BTC_JPY', 'coincheck:btc_jpy', 'zaif:btc_jpy', 'quoine:BTCJPY',
+    'bitfinex:btcusd', 'quoine:BTCUSD', 'poloniex:USDT_BTC',
+    'bitflyer:ETH_BTC', 'bitfinex:ethbtc', 'poloniex:BTC_ETH', 'zaif:eth_btc', 'quoine:ETHBTC',
+    'bitflyer:BCH_BTC', 'bitfinex:bchbtc', 'poloniex:BTC_BCH', 'zaif:bch_btc',
+    'oanda:USD_JPY', 'oanda:EUR_JPY',
+])
+
+
+def _price(value):
+    return None if isnan(value) else value
+
+
+class _Venue(object):
+    __slots__ = ('key', 'offset', 'ask', 'bid', 'version')
+
+    def __init__(self, key, offset):
+        self.key = key
+        self.offset = offset
+        self.ask = None
+        self.bid = None
+        self.version = 0
+
+
+class _Book(object):
+    def __init__(self):
+        self.venues = {}
+        self.asks = []
+        self.bids = []
+
+
+class ConsolidatedBook(object):
+    # Best ask/bid across the venues per product, with a heap per side and lazy deletion of the outdated entries.
+    # Venues without an update within the stale seconds are evicted, including the unchanged updates on the board.
+
+    def __init__(self, board, sources=VENUES, stale=60):
+        self.__board = board
+        self.__lock = Lock()
+        self.__stale = float(stale)
+        self.__sources = set(tuple(s.strip().split(':', 1)) for s in sources.split(',') if len(s.strip()) > 0)
+        self.__books = {}
+
+    def on_quote(self, site, product, code, quote):
+
+        # Spot venues only, the derivatives of the same product are not comparable.
+        if (site, code) not in self.__sources:
+            return
+
+        ask = _price(quote[0])
+        bid = _price(quote[1])
+
+        with self.__lock:
+
+            book = self.__books[product] if product in self.__books else None
+
+            if book is None:
+                book = _Book()
+                self.__books[product] = book
+
+            key = '%s:%s' % (site, code)
+
+            venue = book.venues[key] if key in book.venues else None
+
+            if venue is None:
+                venue = _Venue(key, self.__board.find(site, code))
+                book.venues[key] = venue
+
+            if venue.ask == ask and venue.bid == bid:
+                return
+
+            self.__push(book, venue, ask, bid)
+
+            # Outdated entries are dropped while on the top, rebuilt once they dominate the heap.
+            if len(book.asks) + len(book.bids) > 4 * len(book.venues) + 16:
+                self.__compact(book)
+
+    @staticmethod
+    def __push(book, venue, ask, bid):
+
+        # Entries of the previous version are left in the heaps, and skipped once on the top.
+        venue.ask = ask
+        venue.bid = bid
+        venue.version = venue.version + 1
+
+        if ask is not None:
+            heappush(book.asks, (ask, venue.version, venue.key, venue))
+
+        if bid is not None:
+            heappush(book.bids, (-bid, venue.version, venue.key, venue))
+
+    @staticmethod
+    def __compact(book):
+        book.asks = [(v.ask, v.version, v.key, v) for v in book.venues.values() if v.ask is not None]
+        book.bids = [(-v.bid, v.version, v.key, v) for v in book.venues.values() if v.bid is not None]
+        heapify(book.asks)
+        heapify(book.bids)
+
+    @staticmethod
+    def __top(heap):
+
+        while len(heap) > 0:
+
+            price, version, key, venue = heap[0]
+
+            if version == venue.version:
+                return price, key
+
+            heappop(heap)
+
+        return None, None
+
+    def get_best(self, product):
+        # (best ask, venue, best bid, venue, number of live venues)
+
+        with self.__lock:
+
+            book = self.__books[product] if product in self.__books else None
+
+            if book is None:
+                return None, None, None, None, 0
+
+            cutoff = time() - self.__stale
+
+            for venue in book.venues.values():
+
+                live = venue.ask is not None or venue.bid is not None
+
+                quote = self.__board.read(venue.offset)
+
+                if live and not quote[5] >= cutoff:
+                    self.__push(book, venue, None, None)
+
+                if not live and quote[5] >= cutoff:
+                    # Updated again with the unchanged prices, which are not notified.
+                    self.__push(book, venue, _price(quote[0]), _price(quote[1]))
+
+            ask, ask_venue = self.__top(book.asks)
+            bid, bid_venue = self.__top(book.bids)
+
+            venues = sum(1 for v in book.venues.values() if v.ask is not None or v.bid is not None)
+
+        return ask, ask_venue, -bid if bid is not None else None, bid_venue, venues
+
+    def describe(self):
+        return []
+
+    def collect(self):
+
+        venues = GaugeMetricFamily('ticker_consolidated_venue', 'Venue holding the consolidated best price',
+                                   labels=['product', 'side', 'venue'])
+
+        families = [venues]
+
+        for product in list(self.__books.keys()):
+
+            ask, ask_venue, bid, bid_venue, count = self.get_best(product)
+
+            n = product.name.lower()
+            d = product.name
+
+            family = GaugeMetricFamily('ticker_consolidated_' + n, 'Consolidated best bid/offer for ' + d,
+                                       labels=['id'])
+            family.add_metric(['ask'], ask if ask is not None else float('nan'))
+            family.add_metric(['bid'], bid if bid is not None else float('nan'))
+            family.add_metric(['venues'], count)
+            families.append(family)
+
+            if ask_venue is not None:
+                venues.add_metric([d, 'ask', ask_venue], 1)
+
+            if bid_venue is not None:
+                venues.add_metric([d, 'bid', bid_venue], 1)
+
+        return families
@@ -1,10 +1,22 @@
+from array import array
 from enum import Enum, auto
 from logging import Formatter, StreamHandler, DEBUG, INFO, getLogger
-from math import nan
+from math import isnan, nan
 from os import getenv
-from threading import Lock
+from threading import Lock, Thread
+from time import sleep, time
 
-from prometheus_client import Gauge, start_http_server
+from prometheus_client import Counter, Gauge, REGISTRY, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+from cryptotheus.board import ASK, BID, LTP, MID, TIMESTAMP, UPDATED, PriceBoard
+from cryptotheus.consolidated import VENUES, ConsolidatedBook
+from cryptotheus.conversion import SOURCES, ConversionGraph
+from cryptotheus.derived import DEFINITIONS, DerivedMetrics
+from cryptotheus.journal import ExecutionJournal
+from cryptotheus.limiter import TokenBucket
+from cryptotheus.recorder import TickRecorder
+from cryptotheus.session import SiteSession
 
 
 class ProductType(Enum):
@@ -30,6 +42,88 @@ class UnitType(Enum):
     BCH = auto()
 
 
+def _to_price(value):
+    if value is None:
+        return None
+
+    price = float(value)
+
+    return price if price != 0 else None
+
+
+def _from_board(value):
+    return None if isnan(value) else value
+
+
+class _Slot(object):
+    __slots__ = ('values', 'index')
+
+    def __init__(self, values, index):
+        self.values = values
+        self.index = index
+
+    def set(self, value):
+        self.values[self.index] = value
+
+
+class _SnapshotFamily(object):
+    def __init__(self, snapshot, name, description):
+        self.__snapshot = snapshot
+        self.__name = name
+        self.__description = description
+
+    def labels(self, label):
+        return self.__snapshot.allocate(self.__name, self.__description, label)
+
+
+class PriceSnapshot(object):
+    # Preallocated slot per (site, code, field), written without locks and only rendered when scraped.
+
+    def __init__(self, capacity=256):
+        self.__lock = Lock()
+        self.__values = array('d', [nan]) * int(capacity)
+        self.__slots = []
+
+    def allocate(self, name, description, label):
+
+        with self.__lock:
+
+            index = len(self.__slots)
+
+            if index >= len(self.__values):
+                # Grown in place, so that the existing slots keep referring to the same array.
+                self.__values.extend(array('d', [nan]) * len(self.__values))
+
+            self.__slots.append((name, description, label))
+
+        return _Slot(self.__values, index)
+
+    def family(self, name, description):
+        # Same interface as the Gauge, so that the slots are resolved the same way as the label children.
+        return _SnapshotFamily(self, name, description)
+
+    def describe(self):
+        return []
+
+    def collect(self):
+
+        families = {}
+
+        values = self.__values
+
+        for index, (name, description, label) in enumerate(list(self.__slots)):
+
+            family = families[name] if name in families else None
+
+            if family is None:
+                family = GaugeMetricFamily(name, description, labels=['id'])
+                families[name] = family
+
+            family.add_metric([label], values[index])
+
+        return list(families.values())
+
+
 class TickerGauges(object):
     # Constants
     __LABEL_ASK = 'ask'
@@ -41,16 +135,30 @@ class TickerGauges(object):
     __MID = {}
     __LTP = {}
 
-    __cached_ask = {}
-    __cached_bid = {}
-    __cached_mid = {}
-    __cached_ltp = {}
+    __UNCHANGED = Counter('gauge_unchanged', 'Ticker updates identical to the previous values, not written', ['site'])
 
-    def __init__(self, site, product):
+    def __init__(self, site, product, board, snapshot=None, listeners=(), logger=None):
         self.__site = site
         self.__product = product
+        self.__board = board
+        self.__snapshot = snapshot
+        self.__listeners = list(listeners)
+        self.__logger = logger
+        self.__lock = Lock()
+        self.__bbo_children = {}
+        self.__ltp_children = {}
+        self.__records = {}
+        self.__last_bbo = {}
+        self.__last_ltp = {}
+        self.__unchanged = TickerGauges.__UNCHANGED.labels(site)
 
     def __get_gauge(self, gauges, prefix, description):
+
+        if self.__snapshot is not None:
+            n = self.__product.name.lower()
+            d = self.__product.name
+            return self.__snapshot.family(prefix + n, description + d)
+
         with TickerGauges.__LCK:
             gauge = gauges[self.__product] if self.__product in gauges else None
 
@@ -62,40 +170,149 @@ class TickerGauges(object):
 
         return gauge
 
-    def update_bbo(self, code, ask, bid, mid=None):
-        a = float(ask) if ask is not None and float(ask) != 0 else None
-        b = float(bid) if bid is not None and float(bid) != 0 else None
-        g = self.__get_gauge(TickerGauges.__BBO, 'ticker_bbo_', 'Best bid/offer price for ')
-        g.labels("%s:%s:%s" % (self.__site, code, self.__LABEL_ASK)).set(a if a is not None else nan)
-        g.labels("%s:%s:%s" % (self.__site, code, self.__LABEL_BID)).set(b if b is not None else nan)
-
-        m = float(mid) if mid is not None and float(mid) != 0 else None
+    def register(self, code, bbo=True, ltp=True):
+
+        # Resolve the label children once, so that the updates are plain sets without locks.
+        with self.__lock:
+
+            if code not in self.__records:
+                record = self.__board.allocate(self.__site, code, self.__product.name)
+                self.__board.write(record, [(ASK, nan), (BID, nan), (MID, nan), (LTP, nan)])
+
+                if record is None and self.__logger is not None:
+                    # Still exported by the gauges, only not shared nor cached. (cf: price_board_capacity)
+                    self.__logger.warning('Price board is full : %s:%s (capacity=%s)',
+                                          self.__site, code, self.__board.get_capacity())
+                self.__records[code] = record
+
+            if bbo and code not in self.__bbo_children:
+                g = self.__get_gauge(TickerGauges.__BBO, 'ticker_bbo_', 'Best bid/offer price for ')
+                m = self.__get_gauge(TickerGauges.__MID, 'ticker_mid_', 'Mid price for ')
+                children = (
+                    g.labels("%s:%s:%s" % (self.__site, code, self.__LABEL_ASK)),
+                    g.labels("%s:%s:%s" % (self.__site, code, self.__LABEL_BID)),
+                    m.labels("%s:%s" % (self.__site, code)),
+                )
+                for child in children:
+                    child.set(nan)
+                self.__bbo_children[code] = children
+
+            if ltp and code not in self.__ltp_children:
+                g = self.__get_gauge(TickerGauges.__LTP, 'ticker_ltp_', 'Last trade price for ')
+                child = g.labels("%s:%s" % (self.__site, code))
+                child.set(nan)
+                self.__ltp_children[code] = child
+
+        return self
+
+    def update_bbo(self, code, ask, bid, mid=None, timestamp=None):
+        children = self.__bbo_children[code] if code in self.__bbo_children else None
+
+        if children is None:
+            children = self.register(code, ltp=False).__bbo_children[code]
+
+        a = _to_price(ask)
+        b = _to_price(bid)
+        m = _to_price(mid)
         m = (a + b) * 0.5 if m is None and a is not None and b is not None else m
-        g = self.__get_gauge(TickerGauges.__MID, 'ticker_mid_', 'Mid price for ')
-        g.labels("%s:%s" % (self.__site, code)).set(m if m is not None else nan)
 
-        self.__cached_ask[code] = a
-        self.__cached_bid[code] = b
-        self.__cached_mid[code] = m
+        if self.__skip(self.__last_bbo, code, (a, b, m), a is not None or b is not None, timestamp):
+            return
+
+        a = a if a is not None else nan
+        b = b if b is not None else nan
+        m = m if m is not None else nan
+
+        children[0].set(a)
+        children[1].set(b)
+        children[2].set(m)
+
+        fields = [(ASK, a), (BID, b), (MID, m)]
+
+        if not isnan(a) or not isnan(b):
+            fields.append((UPDATED, time()))
+
+        if timestamp is not None:
+            fields.append((TIMESTAMP, float(timestamp)))
+
+        # Single write, so that the readers never see ask/bid/mid from different updates.
+        self.__board.write(self.__records[code], fields)
+
+        if len(self.__listeners) > 0:
+            self.__notify(code)
+
+    def update_ltp(self, code, ltp, timestamp=None):
+        child = self.__ltp_children[code] if code in self.__ltp_children else None
+
+        if child is None:
+            child = self.register(code, bbo=False).__ltp_children[code]
+
+        p = _to_price(ltp)
+
+        if self.__skip(self.__last_ltp, code, p, p is not None, timestamp):
+            return
+
+        p = p if p is not None else nan
+
+        child.set(p)
+
+        fields = [(LTP, p)]
+
+        if not isnan(p):
+            fields.append((UPDATED, time()))
+
+        if timestamp is not None:
+            fields.append((TIMESTAMP, float(timestamp)))
+
+        self.__board.write(self.__records[code], fields)
+
+        if len(self.__listeners) > 0:
+            self.__notify(code)
+
+    def __notify(self, code):
+        # Full quote after the update, changes only.
+        quote = self.__board.read(self.__records[code])
+
+        for listener in self.__listeners:
+            listener.on_quote(self.__site, self.__product, code, quote)
+
+    def __skip(self, last, code, values, valid, timestamp):
+
+        if code not in last or last[code] != values:
+            last[code] = values
+            return False
+
+        # Identical values, only the update time is refreshed.
+        self.__unchanged.inc()
+
+        if valid:
+            fields = [(UPDATED, time())]
+            if timestamp is not None:
+                fields.append((TIMESTAMP, float(timestamp)))
+            self.__board.write(self.__records[code], fields)
+
+        return True
+
+    def get_quote(self, code):
+        # Consistent (ask, bid, mid, ltp, timestamp) of a single update, None if not available.
+        record = self.__records[code] if code in self.__records else None
 
-    def update_ltp(self, code, ltp):
-        p = float(ltp) if ltp is not None and float(ltp) != 0 else None
-        g = self.__get_gauge(TickerGauges.__LTP, 'ticker_ltp_', 'Last trade price for ')
-        g.labels("%s:%s" % (self.__site, code)).set(p if p is not None else nan)
+        if record is None:
+            return None, None, None, None, None
 
-        self.__cached_ltp[code] = p
+        return tuple(_from_board(v) for v in self.__board.read(record)[:5])
 
     def get_cached_ask(self, code):
-        return self.__cached_ask[code] if code in self.__cached_ask else None
+        return self.get_quote(code)[0]
 
     def get_cached_bid(self, code):
-        return self.__cached_bid[code] if code in self.__cached_bid else None
+        return self.get_quote(code)[1]
 
     def get_cached_mid(self, code):
-        return self.__cached_mid[code] if code in self.__cached_mid else None
+        return self.get_quote(code)[2]
 
     def get_cached_ltp(self, code):
-        return self.__cached_ltp[code] if code in self.__cached_ltp else None
+        return self.get_quote(code)[3]
 
 
 class AccountGauges(object):
@@ -133,6 +350,93 @@ class AccountGauges(object):
         gauge.labels(self.__site, account_type, name).set(v)
 
 
+class ScrapeClock(object):
+    def __init__(self):
+        self.__last = None
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        self.__last = time()
+        return []
+
+    def get_last(self):
+        return self.__last
+
+
+class TickerAgeCollector(object):
+    def __init__(self, board):
+        self.__board = board
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        now = time()
+        family = GaugeMetricFamily('ticker_update_age_seconds', 'Time since the last successful update', labels=['id'])
+
+        for (site, code), quote in self.__board.get_quotes().items():
+            if not isnan(quote[5]):
+                family.add_metric(['%s:%s' % (site, code)], now - quote[5])
+
+        yield family
+
+
+class BoardFollower(Thread):
+    # Quotes written by the other processes to the shared board, notified to the listeners as if updated locally.
+
+    def __init__(self, context, board, listeners, interval=1.0):
+        super(BoardFollower, self).__init__(daemon=True)
+        self.__context = context
+        self.__board = board
+        self.__listeners = list(listeners)
+        self.__interval = float(interval)
+        self.__records = []
+        self.__last = {}
+
+    def run(self):
+
+        while self.__context.is_active():
+
+            try:
+
+                self.poll()
+
+            except Exception as e:
+
+                self.__context.get_logger(self).warn('%s : %s', type(e), e.args)
+
+            sleep(self.__interval)
+
+    def poll(self):
+
+        # Records are only appended, the new ones are indexed once.
+        for offset, site, code, product in self.__board.get_records(len(self.__records)):
+            known = product in ProductType.__members__
+            self.__records.append((offset, site, code, ProductType[product] if known else None))
+
+        for offset, site, code, product in self.__records:
+
+            if product is None:
+                continue
+
+            quote = self.__board.read(offset)
+
+            # Changed prices only, same as the local updates.
+            last = self.__last[offset] if offset in self.__last else None
+
+            prices = tuple(quote[:4])
+
+            if last is not None and (last == prices or all(isnan(a) and isnan(b) for a, b in zip(last, prices))):
+                continue
+
+            self.__last[offset] = prices
+
+            for listener in self.__listeners:
+                listener.on_quote(site, product, code, quote)
+
+
 class CryptotheusContext(object):
     # Logger
     __loggers = {}
@@ -146,14 +450,61 @@ class CryptotheusContext(object):
     # State
     __active = True
 
+    # Rate Limits : requests per second and burst, per scope.
+    __RATE_LIMITS = {
+        'bitflyer': {'public': (500 / 300.0, 20), 'private': (500 / 300.0, 20)},
+        'bitmex': {'public': (30 / 60.0, 10), 'private': (60 / 60.0, 10)},
+    }
+
     def __init__(self,
                  debug=False,
                  host=getenv('metric_host', 'localhost'),
-                 port=getenv('metric_port', 10001)
+                 port=getenv('metric_port', 10001),
+                 pool_size=getenv('http_pool_size', 4),
+                 keepalive=getenv('http_keepalive', 'true'),
+                 timeout=getenv('http_timeout', 10),
+                 journal=getenv('journal_path', None),
+                 collector=getenv('ticker_collector', 'gauge'),
+                 board=getenv('price_board_path', None),
+                 board_capacity=getenv('price_board_capacity', 4096),
+                 rate=getenv('ratelimit_rate', 10),
+                 burst=getenv('ratelimit_burst', 20),
+                 deadline=getenv('ratelimit_deadline', 10),
+                 ticks=getenv('tick_path', None),
+                 tick_rotate=getenv('tick_rotate', 64 * 1024 * 1024),
+                 tick_flush=getenv('tick_flush', 1.0),
+                 conversion_sources=getenv('conversion_sources', SOURCES),
+                 derived=getenv('derived_metrics', DEFINITIONS),
+                 consolidated=getenv('consolidated_book', 'true'),
+                 consolidated_sources=getenv('consolidated_sources', VENUES),
+                 consolidated_stale=getenv('consolidated_stale', 60)
                  ):
         self.__level = DEBUG if debug else INFO
         self.__host = host
         self.__port = port
+        self.__pool_size = pool_size
+        self.__keepalive = keepalive
+        self.__timeout = timeout
+        self.__sessions = {}
+        self.__sessions_lock = Lock()
+        self.__journal_path = journal
+        self.__journal = None
+        self.__journal_lock = Lock()
+        self.__clock = ScrapeClock()
+        self.__snapshot = PriceSnapshot() if collector == 'snapshot' else None
+        self.__board = PriceBoard(path=board, capacity=board_capacity)
+        self.__rate = rate
+        self.__burst = burst
+        self.__deadline = deadline
+        self.__recorder = TickRecorder(self, ticks, rotate=tick_rotate, flush=tick_flush) if ticks else None
+        self.__conversions = ConversionGraph(list(UnitType), list(ProductType), sources=conversion_sources)
+        self.__derived = DerivedMetrics(derived, snapshot=self.__snapshot) if derived else None
+        self.__consolidated = ConsolidatedBook(self.__board, sources=consolidated_sources, stale=consolidated_stale) \
+            if str(consolidated).lower() == 'true' else None
+        self.__listeners = [self.__conversions]
+        self.__listeners += [self.__consolidated] if self.__consolidated is not None else []
+        self.__listeners += [self.__derived] if self.__derived is not None else []
+        self.__listeners += [self.__recorder] if self.__recorder is not None else []
 
     def get_logger(self, source):
 
@@ -177,11 +528,107 @@ class CryptotheusContext(object):
 
         self.get_logger(self).info('Starting server [%s:%s]', self.__host, self.__port)
 
-        start_http_server(self.__port, addr=self.__host)
+        REGISTRY.register(self.__clock)
+
+        REGISTRY.register(TickerAgeCollector(self.__board))
+
+        if self.__consolidated is not None:
+            REGISTRY.register(self.__consolidated)
+
+        if self.__snapshot is not None:
+            REGISTRY.register(self.__snapshot)
+
+        if self.__recorder is not None:
+            self.__recorder.start()
+
+        start_http_server(int(self.__port), addr=self.__host)
+
+    def follow_board(self, interval=getenv('board_follow_interval', 1.0)):
+        # Converted, consolidated and derived across the processes sharing the board, instead of per process.
+        # (cf: sharded workers, converting with the quotes of the sites in the other shards)
+        listeners = [self.__conversions]
+        listeners += [self.__consolidated] if self.__consolidated is not None else []
+        listeners += [self.__derived] if self.__derived is not None else []
+
+        if self.__consolidated is not None:
+            REGISTRY.register(self.__consolidated)
+
+        follower = BoardFollower(self, self.__board, listeners, interval=interval)
+        follower.start()
+
+        return follower
 
     def is_active(self):
         return self.__active
 
+    def get_last_scrape(self):
+        return self.__clock.get_last()
+
+    def get_session(self, site):
+
+        with self.__sessions_lock:
+
+            session = self.__sessions[site] if site in self.__sessions else None
+
+            if session is None:
+                pool_size = getenv(site + '_pool_size', self.__pool_size)
+                keepalive = str(getenv(site + '_keepalive', self.__keepalive)).lower() in ('true', '1', 'yes')
+                timeout = getenv(site + '_timeout', self.__timeout)
+                public = self.__create_bucket(site, 'public')
+                private = self.__create_bucket(site, 'private')
+                deadline = getenv(site + '_ratelimit_deadline', self.__deadline)
+                session = SiteSession(site, pool_size=pool_size, keepalive=keepalive, timeout=timeout,
+                                      public=public, private=private, deadline=deadline)
+                self.__sessions[site] = session
+                self.get_logger(self).info('Session [%s] : pool_size=%s keepalive=%s timeout=%s public=%s private=%s',
+                                           site, pool_size, keepalive, timeout,
+                                           public.get_rate() if public is not None else None,
+                                           private.get_rate() if private is not None else None)
+
+        return session
+
+    def __create_bucket(self, site, scope):
+
+        # Documented limits as defaults, (requests per second, burst) per scope.
+        defaults = self.__RATE_LIMITS[site] if site in self.__RATE_LIMITS else {}
+        default = defaults[scope] if scope in defaults else (self.__rate, self.__burst)
+
+        rate = getenv('%s_%s_rate' % (site, scope), default[0])
+        burst = getenv('%s_%s_burst' % (site, scope), default[1])
+
+        if str(rate).lower() == 'none' or float(rate) <= 0:
+            return None
+
+        return TokenBucket(site, scope, rate, burst)
+
+    def get_board(self):
+        return self.__board
+
+    def get_conversions(self):
+        return self.__conversions
+
+    def get_derived(self):
+        return self.__derived
+
+    def get_consolidated(self):
+        return self.__consolidated
+
+    def get_snapshot(self):
+        return self.__snapshot
+
+    def get_journal(self):
+
+        if self.__journal_path is None:
+            return None
+
+        with self.__journal_lock:
+
+            if self.__journal is None:
+                self.get_logger(self).info('Opening journal [%s]', self.__journal_path)
+                self.__journal = ExecutionJournal(self.__journal_path)
+
+        return self.__journal
+
     def get_ticker_gauges(self, site, product):
 
         products = self.__tickers[site] if site in self.__tickers else None
@@ -193,7 +640,8 @@ class CryptotheusContext(object):
         gauges = products[product] if product in products else None
 
         if gauges is None:
-            gauges = TickerGauges(site, product)
+            gauges = TickerGauges(site, product, self.__board, snapshot=self.__snapshot, listeners=self.__listeners,
+                                  logger=self.get_logger(self))
             products[product] = gauges
 
         return gauges
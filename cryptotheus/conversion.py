@@ -0,0 +1,174 @@
+from collections import deque
+from math import isnan
+from threading import Lock
+
+# Spot sources in the order of preference, the first one quoted is used per product.
+SOURCES = ','.join([
+    'bitflyer:BTC_JPY', 'coincheck:btc_jpy', 'zaif:btc_jpy', 'quoine:BTCJPY',
+    'bitfinex:btcusd', 'quoine:BTCUSD', 'poloniex:USDT_BTC',
+    'bitflyer:ETH_BTC', 'bitfinex:ethbtc', 'poloniex:BTC_ETH', 'zaif:eth_btc', 'quoine:ETHBTC',
+    'bitflyer:BCH_BTC', 'bitfinex:bchbtc', 'poloniex:BTC_BCH', 'zaif:bch_btc',
+    'oanda:USD_JPY',
+])
+
+
+class ConversionGraph(object):
+    # Units as the nodes and the products as the edges. (e.g. JPY_BTC : 1 BTC = mid JPY)
+    # The shortest path per pair of units is resolved when the quoted products change,
+    # and the rates are cached until one of the products on the path is quoted again.
+
+    def __init__(self, units, products, sources=SOURCES):
+        self.__lock = Lock()
+        self.__units = list(units)
+        self.__edges = {}
+        self.__sources = {}
+        self.__mids = {}
+        self.__rates = {}
+        self.__paths = {}
+        self.__dependents = {}
+        self.__topology = None
+
+        names = dict((unit.name, unit) for unit in self.__units)
+
+        for product in products:
+
+            quote, base = product.name.split('_', 1)
+
+            # Products of the units not converted. (e.g. EUR)
+            if quote in names and base in names:
+                self.__edges[product] = (names[base], names[quote])
+
+        for priority, source in enumerate(s.strip() for s in sources.split(',') if len(s.strip()) > 0):
+            site, code = source.split(':', 1)
+            self.__sources[(site, code)] = priority
+
+    def on_quote(self, site, product, code, quote):
+
+        priority = self.__sources[(site, code)] if (site, code) in self.__sources else None
+
+        if priority is None or product not in self.__edges:
+            return
+
+        mid = quote[2] if not isnan(quote[2]) else quote[3]
+
+        with self.__lock:
+
+            candidates = self.__mids[product] if product in self.__mids else None
+
+            if candidates is None:
+                candidates = {}
+                self.__mids[product] = candidates
+
+            previous = self.__select(candidates)
+
+            candidates[priority] = mid if not isnan(mid) and mid > 0 else None
+
+            current = self.__select(candidates)
+
+            if current == previous:
+                return
+
+            if previous is None or current is None:
+                # Quoted or dropped, the paths themselves may change.
+                self.__topology = None
+                self.__rates = {}
+            else:
+                for pair in self.__dependents[product] if product in self.__dependents else []:
+                    self.__rates.pop(pair, None)
+
+    @staticmethod
+    def __select(candidates):
+        for priority in sorted(candidates.keys()):
+            if candidates[priority] is not None:
+                return candidates[priority]
+        return None
+
+    def __resolve(self):
+
+        # Breadth-first from each unit, over the products currently quoted.
+        adjacent = dict((unit, []) for unit in self.__units)
+
+        for product, (base, quote) in self.__edges.items():
+            if product in self.__mids and self.__select(self.__mids[product]) is not None:
+                adjacent[base].append((quote, product, True))
+                adjacent[quote].append((base, product, False))
+
+        paths = {}
+        dependents = {}
+
+        for source in self.__units:
+
+            visited = {source: []}
+            queue = deque([source])
+
+            while len(queue) > 0:
+
+                unit = queue.popleft()
+
+                for target, product, forward in adjacent[unit]:
+
+                    if target in visited:
+                        continue
+
+                    visited[target] = visited[unit] + [(product, forward)]
+                    queue.append(target)
+
+            for target, path in visited.items():
+
+                paths[(source, target)] = path
+
+                for product, forward in path:
+                    dependents.setdefault(product, []).append((source, target))
+
+        self.__paths = paths
+        self.__dependents = dependents
+        self.__topology = True
+
+    def get_rate(self, source, target):
+
+        if source == target:
+            return 1.0
+
+        # Single lookup while cached.
+        rate = self.__rates.get((source, target))
+
+        if rate is not None:
+            return rate
+
+        with self.__lock:
+
+            if self.__topology is None:
+                self.__resolve()
+
+            path = self.__paths[(source, target)] if (source, target) in self.__paths else None
+
+            if path is None:
+                return None
+
+            rate = 1.0
+
+            for product, forward in path:
+                mid = self.__select(self.__mids[product])
+                rate = rate * mid if forward else rate / mid
+
+            self.__rates[(source, target)] = rate
+
+        return rate
+
+    def get_path(self, source, target):
+        # [(product, forward)] of the current best path, None if not connected.
+        with self.__lock:
+
+            if self.__topology is None:
+                self.__resolve()
+
+            return list(self.__paths[(source, target)]) if (source, target) in self.__paths else None
+
+    def convert(self, value, source, target):
+
+        if value is None:
+            return None
+
+        rate = self.get_rate(source, target)
+
+        return value * rate if rate is not None else None
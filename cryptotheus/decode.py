@@ -0,0 +1,152 @@
+from json import JSONDecoder
+from re import compile, escape
+
+try:
+    # Optional faster backend, used for the full decodes.
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+_DECODER = JSONDecoder()
+
+# Strings as a whole, once reduced to the quotes and the brackets.
+_STRING = compile(b'"[^"]*"')
+
+# Bytes other than the quotes and the brackets, the strings without any brackets are reduced to '""'.
+_OTHERS = bytes(c for c in range(256) if c not in b'"{}[]')
+
+
+def _text(content):
+    return content.decode('utf-8') if isinstance(content, (bytes, bytearray)) else content
+
+
+def _opens(text, token):
+    return text.lstrip()[:1] == token
+
+
+def _nesting(text):
+    # Opened minus closed brackets outside of the strings, of a text starting outside of a string.
+    # None if the text ends within a string. (e.g. a key within a value, after an escaped quote)
+    data = text.encode('utf-8')
+
+    if b'\\' in data:
+        # Escaped backslashes first, so that the escaped quotes are not taken as the closing ones.
+        data = data.replace(b'\\\\', b'').replace(b'\\"', b'')
+
+    kept = data.translate(None, _OTHERS)
+
+    quotes = kept.count(b'"')
+
+    if quotes % 2 != 0:
+        return None
+
+    # Paired up only if every string is reduced to '""', otherwise the ones with the brackets are removed.
+    if kept.count(b'""') * 2 != quotes:
+        kept = _STRING.sub(b'', kept)
+
+    return kept.count(b'{') + kept.count(b'[') - kept.count(b'}') - kept.count(b']')
+
+
+class MapSelector(object):
+    # Decodes only the values of the targeted keys, from a top-level JSON object.
+    # Candidates are located by scanning for the keys, then kept only if at the top level, by counting the brackets
+    # outside of the strings up to the candidate. (e.g. not the same key nested within the value of another key)
+
+    def __init__(self, keys):
+        self.__keys = set(keys)
+        self.__pattern = compile('"(%s)"\\s*:\\s*' % '|'.join(escape(k) for k in sorted(self.__keys)))
+
+    def __call__(self, content):
+
+        text = _text(content)
+
+        if not _opens(text, '{'):
+            return loads(content)
+
+        result = {}
+
+        depth = 0
+        position = 0
+
+        for match in self.__pattern.finditer(text):
+
+            key = match.group(1)
+
+            if key in result or match.start() < position:
+                continue
+
+            nesting = _nesting(text[position:match.start()])
+
+            if nesting is None:
+                continue
+
+            depth = depth + nesting
+
+            if depth != 1:
+                position = match.start()
+                continue
+
+            value, position = _DECODER.raw_decode(text, match.end())
+
+            result[key] = value
+
+            if len(result) == len(self.__keys):
+                break
+
+        return result
+
+
+class ListSelector(object):
+    # Decodes only the elements of a top-level JSON array, whose string field matches one of the values.
+    # Elements are located by scanning for the field, then decoded from the enclosing brace, if at the array level.
+    # Falls back to the full decode, if an element cannot be located that way. (e.g. the field in a nested object)
+
+    def __init__(self, field, values):
+        self.__field = field
+        self.__values = set(values)
+        self.__pattern = compile('"%s"\\s*:\\s*"(%s)"' % (
+            escape(field), '|'.join(escape(v) for v in sorted(self.__values))
+        ))
+
+    def __matches(self, value):
+        # Strings only, the other values of the field are not hashable. (e.g. nested objects)
+        return isinstance(value, str) and value in self.__values
+
+    def __call__(self, content):
+
+        text = _text(content)
+
+        if not _opens(text, '['):
+            return loads(content)
+
+        result = []
+
+        depth = 0
+        position = 0
+
+        for match in self.__pattern.finditer(text):
+
+            # Within the element already decoded. (e.g. the same field nested within the element)
+            if match.start() < position:
+                continue
+
+            start = text.rfind('{', position, match.start())
+
+            nesting = _nesting(text[position:start]) if start >= 0 else None
+
+            # Brace at the array level, neither nested nor within a string.
+            depth = depth + nesting if nesting is not None else 0
+
+            try:
+                element, end = _DECODER.raw_decode(text, start) if depth == 1 else (None, -1)
+            except ValueError:
+                element, end = None, -1
+
+            if not isinstance(element, dict) or end < match.end() or element.get(self.__field) != match.group(1):
+                return [e for e in loads(content) if isinstance(e, dict) and self.__matches(e.get(self.__field))]
+
+            result.append(element)
+
+            position = end
+
+        return result
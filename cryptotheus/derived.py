@@ -0,0 +1,132 @@
+from ast import Add, BinOp, Constant, Div, Expression, Load, Mult, Name, Sub, UAdd, UnaryOp, USub, parse, walk
+from math import isnan, nan
+from re import compile as regex
+from threading import Lock
+
+from prometheus_client import Gauge
+
+# Inputs as 'site:code:field', the field is one of ask/bid/mid/ltp and defaults to mid.
+_REFERENCE = regex(r'([A-Za-z]\w*):(\w+)(?::(ask|bid|mid|ltp))?')
+
+_FIELDS = {'ask': 0, 'bid': 1, 'mid': 2, 'ltp': 3}
+
+_ALLOWED = (Expression, BinOp, UnaryOp, Constant, Name, Load, Add, Sub, Mult, Div, USub, UAdd)
+
+DEFINITIONS = ';'.join([
+    'bitflyer_fx_premium=bitflyer:FX_BTC_JPY / bitflyer:BTC_JPY - 1',
+    'bitflyer_usd_premium=bitflyer:BTC_JPY / (bitfinex:btcusd * oanda:USD_JPY) - 1',
+    'bitflyer_coincheck_spread=bitflyer:BTC_JPY:bid - coincheck:btc_jpy:ask',
+])
+
+
+class _Definition(object):
+    def __init__(self, name, expression, references, code, child):
+        self.name = name
+        self.expression = expression
+        self.references = references
+        self.code = code
+        self.child = child
+
+
+class DerivedMetrics(object):
+    # Arithmetic over the ticker quotes, recomputed at ingest for the definitions of the updated quote only.
+    __GAUGE = None
+    __LCK = Lock()
+
+    def __init__(self, definitions=DEFINITIONS, snapshot=None):
+        self.__lock = Lock()
+        self.__quotes = {}
+        self.__dependents = {}
+        self.__definitions = []
+
+        for definition in (d.strip() for d in definitions.split(';') if len(d.strip()) > 0):
+
+            name, expression = [token.strip() for token in definition.split('=', 1)]
+
+            self.__add(name, expression, self.__get_gauge(snapshot))
+
+    @staticmethod
+    def __get_gauge(snapshot):
+
+        description = 'Derived value of the ticker prices'
+
+        if snapshot is not None:
+            return snapshot.family('ticker_derived', description)
+
+        with DerivedMetrics.__LCK:
+
+            if DerivedMetrics.__GAUGE is None:
+                DerivedMetrics.__GAUGE = Gauge('ticker_derived', description, ['id'])
+
+        return DerivedMetrics.__GAUGE
+
+    def __add(self, name, expression, gauge):
+
+        references = []
+
+        def substitute(match):
+            reference = (match.group(1), match.group(2), _FIELDS[match.group(3) or 'mid'])
+            references.append(reference)
+            return '_%d' % (len(references) - 1)
+
+        # References are substituted by the positional variables, then only arithmetic is accepted.
+        tree = parse(_REFERENCE.sub(substitute, expression), mode='eval')
+
+        variables = set('_%d' % index for index in range(len(references)))
+
+        for node in walk(tree):
+            if not isinstance(node, _ALLOWED):
+                raise ValueError('Unsupported expression : %s = %s' % (name, expression))
+            if isinstance(node, Constant) and type(node.value) not in (int, float):
+                raise ValueError('Unsupported constant : %s = %s' % (name, node.value))
+            if isinstance(node, Name) and node.id not in variables:
+                raise ValueError('Unknown reference : %s = %s' % (name, node.id))
+
+        child = gauge.labels(name)
+        child.set(nan)
+
+        definition = _Definition(name, expression, references, compile(tree, name, 'eval'), child)
+
+        self.__definitions.append(definition)
+
+        for site, code, field in references:
+            dependents = self.__dependents.setdefault((site, code), [])
+            if definition not in dependents:
+                dependents.append(definition)
+
+    def get_names(self):
+        return [definition.name for definition in self.__definitions]
+
+    def on_quote(self, site, product, code, quote):
+
+        dependents = self.__dependents[(site, code)] if (site, code) in self.__dependents else None
+
+        if dependents is None:
+            return
+
+        with self.__lock:
+
+            self.__quotes[(site, code)] = quote
+
+            for definition in dependents:
+                definition.child.set(self.__evaluate(definition))
+
+    def __evaluate(self, definition):
+
+        variables = {'__builtins__': {}}
+
+        for index, (site, code, field) in enumerate(definition.references):
+
+            quote = self.__quotes[(site, code)] if (site, code) in self.__quotes else None
+
+            value = quote[field] if quote is not None else nan
+
+            if isnan(value):
+                return nan
+
+            variables['_%d' % index] = value
+
+        try:
+            return float(eval(definition.code, variables))
+        except ZeroDivisionError:
+            return nan
@@ -0,0 +1,161 @@
+from asyncio import Semaphore, gather, new_event_loop, run_coroutine_threadsafe, set_event_loop, sleep
+from os import getenv
+from threading import Thread
+from time import perf_counter
+from urllib.parse import urlparse
+
+from cryptotheus.context import CryptotheusContext
+from cryptotheus.limiter import RateLimitExceeded
+
+
+class AsyncEngine(Thread):
+    def __init__(self, context,
+                 concurrency=getenv('engine_concurrency', 4)
+                 ):
+        super(AsyncEngine, self).__init__()
+        self.__context = context
+        self.__concurrency = int(concurrency)
+        self.__sources = []
+        self.__semaphores = {}
+        self.__sessions = {}
+        self.__loop = new_event_loop()
+
+    def register(self, source):
+        self.__sources.append(source)
+
+    def submit(self, source):
+        # Single cycle, scheduled from other threads. (cf: Scheduler)
+        return run_coroutine_threadsafe(self.__cycle(source), self.__loop)
+
+    def run(self):
+
+        set_event_loop(self.__loop)
+
+        for source in self.__sources:
+            self.__loop.create_task(self.__poll(source))
+
+        try:
+
+            self.__loop.run_forever()
+
+        finally:
+
+            for session in self.__sessions.values():
+                self.__loop.run_until_complete(session.close())
+
+            self.__loop.close()
+
+    def __get_site(self, site):
+
+        # Only accessed from the event loop thread.
+        if site not in self.__semaphores:
+            limit = int(getenv(site + '_concurrency', self.__concurrency))
+            self.__semaphores[site] = Semaphore(limit)
+            self.__sessions[site] = self.__context.get_session(site).create_async()
+            self.__context.get_logger(self).info('Concurrency [%s] = %s', site, limit)
+
+        return self.__sessions[site], self.__semaphores[site]
+
+    async def __poll(self, source):
+
+        while self.__context.is_active():
+
+            await self.__cycle(source)
+
+            await sleep(float(source.get_interval()))
+
+    async def __cycle(self, source):
+
+        log = self.__context.get_logger(self)
+
+        site = source.get_site()
+
+        session, semaphore = self.__get_site(site)
+
+        requests = source.get_requests()
+
+        results = await gather(*[self.__fetch(session, semaphore, site, u, h, s) for k, u, h, s in requests])
+
+        responses = {}
+
+        for index, request in enumerate(requests):
+            responses[request[0]] = results[index]
+
+        try:
+
+            source.process(responses)
+
+        except Exception as e:
+
+            log.warn('%s : %s', type(e), e.args)
+
+    async def __fetch(self, session, semaphore, site, url, headers, select):
+
+        log = self.__context.get_logger(self)
+
+        recorder = self.__context.get_session(site)
+
+        endpoint = urlparse(url).path
+
+        try:
+
+            # Shared with the threaded accounts of the site, waited on the event loop without a thread.
+            await recorder.acquire_async()
+
+        except RateLimitExceeded as e:
+
+            log.warn('%s : %s', type(e), e.args)
+
+            return None
+
+        async with semaphore:
+
+            try:
+
+                start = perf_counter()
+
+                async with session.get(url, headers=recorder.conditional(url, headers)) as response:
+                    content = await response.read()
+                    etag = response.headers.get('ETag')
+                    recorder.record_limits(response.headers, status=response.status)
+
+            except Exception as e:
+
+                recorder.record_error(endpoint, e)
+
+                log.warn('%s : %s', type(e), e.args)
+
+                return None
+
+        try:
+
+            return recorder.parse(url, response.status, perf_counter() - start, content, select=select, etag=etag)
+
+        except Exception as e:
+
+            log.warn('%s : %s', type(e), e.args)
+
+            return None
+
+
+def main():
+    from cryptotheus import ticker_bitfinex, ticker_bitflyer, ticker_bitmex, ticker_coincheck
+    from cryptotheus import ticker_oanda, ticker_poloniex, ticker_quoine, ticker_zaif
+
+    context = CryptotheusContext(debug=True)
+    context.launch_server()
+
+    target = AsyncEngine(context)
+    target.register(ticker_bitfinex.BitfinexTicker(context))
+    target.register(ticker_bitflyer.BitflyerTicker(context))
+    target.register(ticker_bitmex.BitmexTicker(context))
+    target.register(ticker_coincheck.CoincheckTicker(context))
+    target.register(ticker_oanda.OandaTicker(context))
+    target.register(ticker_poloniex.PoloniexTicker(context))
+    target.register(ticker_quoine.QuoineTicker(context))
+    target.register(ticker_zaif.ZaifTicker(context))
+    target.start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from json import dumps, loads
+from sqlite3 import connect
+from threading import Lock
+
+
+class ExecutionJournal(object):
+    def __init__(self, path):
+        self.__lock = Lock()
+        self.__connection = connect(path, check_same_thread=False)
+
+        with self.__lock, self.__connection as c:
+            c.execute('PRAGMA journal_mode=WAL')
+            c.execute('CREATE TABLE IF NOT EXISTS executions ('
+                      'site TEXT NOT NULL, product TEXT NOT NULL, id TEXT NOT NULL, '
+                      'timestamp REAL NOT NULL, value REAL NOT NULL, '
+                      'PRIMARY KEY (site, product, id))')
+            c.execute('CREATE INDEX IF NOT EXISTS executions_timestamp ON executions (site, product, timestamp)')
+            c.execute('CREATE TABLE IF NOT EXISTS cursors ('
+                      'site TEXT NOT NULL, product TEXT NOT NULL, cursor TEXT NOT NULL, '
+                      'PRIMARY KEY (site, product))')
+
+    def load(self, site, product, since):
+
+        with self.__lock:
+
+            row = self.__connection.execute(
+                'SELECT cursor FROM cursors WHERE site = ? AND product = ?', (site, product)
+            ).fetchone()
+
+            executions = self.__connection.execute(
+                'SELECT timestamp, value FROM executions WHERE site = ? AND product = ? AND timestamp >= ? '
+                'ORDER BY timestamp',
+                (site, product, since)
+            ).fetchall()
+
+        return loads(row[0]) if row is not None else None, executions
+
+    def append(self, site, product, cursor, executions, since):
+
+        with self.__lock, self.__connection as c:
+
+            c.executemany(
+                'INSERT OR IGNORE INTO executions (site, product, id, timestamp, value) VALUES (?, ?, ?, ?, ?)',
+                [(site, product, str(i), t, v) for i, t, v in executions]
+            )
+
+            if cursor is not None:
+                c.execute('INSERT OR REPLACE INTO cursors (site, product, cursor) VALUES (?, ?, ?)',
+                          (site, product, dumps(cursor)))
+
+            # Compact the records which fell out of the longest interval.
+            c.execute('DELETE FROM executions WHERE site = ? AND product = ? AND timestamp < ?',
+                      (site, product, since))
+
+    def close(self):
+
+        with self.__lock:
+            self.__connection.close()
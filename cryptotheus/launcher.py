@@ -0,0 +1,128 @@
+from os import environ, getenv, path, remove
+from tempfile import gettempdir
+
+import cryptotheus
+
+
+def run(engine, sites=None, port=None, adaptive=getenv('adaptive_interval', 'false')):
+    # Site -> roles, as selected on the registry. Only the modules of these sites are imported.
+    registry = cryptotheus.Registry()
+
+    sites = registry.select() if sites is None else sites
+
+    if port is None:
+        context = cryptotheus.Context()
+    else:
+        # Worker, consolidated and derived by the launcher across the shards from the shared board.
+        context = cryptotheus.Context(host='localhost', port=port, consolidated='false', derived='')
+
+    context.launch_server()
+
+    if port is not None:
+        # Conversions with the quotes of all the shards, not only of the sites in this one.
+        context.follow_board()
+
+    scheduler = cryptotheus.Scheduler(context)
+
+    adaptive = str(adaptive).lower() == 'true'
+
+    def selected(site, role):
+        return site in sites and role in sites[site]
+
+    # Only the sources of the selected sites are instantiated, so that no other series are registered.
+    tickers = dict((site, registry.load(site, 'ticker')(context)) for site in sites if selected(site, 'ticker'))
+
+    def streamed(site):
+        return site in tickers and selected(site, 'stream') and getenv(site + '_stream', 'false').lower() == 'true'
+
+    if streamed('bitflyer'):
+
+        # Realtime ticker over WebSocket, the REST polling only covers the codes while not streamed.
+        bitflyer = tickers['bitflyer']
+        stream = registry.load('bitflyer', 'stream')(context, bitflyer.get_targets())
+        bitflyer.set_stream(stream)
+        stream.start()
+
+    if streamed('bitmex'):
+
+        # Instrument table patched over WebSocket, the REST polling only runs while not seeded.
+        bitmex = tickers['bitmex']
+        stream = registry.load('bitmex', 'stream')(context, bitmex.get_targets(), bitmex.get_intervals())
+        bitmex.set_stream(stream)
+        stream.start()
+
+    if engine == 'asyncio':
+
+        target = cryptotheus.AsyncEngine(context)
+
+        for ticker in tickers.values():
+            scheduler.add(ticker, submit=target.submit, adaptive=adaptive)
+
+        target.start()
+
+    else:
+
+        for ticker in tickers.values():
+            scheduler.add(ticker, adaptive=adaptive)
+
+    for site in sites:
+
+        if not selected(site, 'account'):
+            continue
+
+        # Delay the first account cycle, to cache the prices for the conversions.
+        account = registry.load(site, 'account')(context)
+        scheduler.add(account, delay=account.get_interval())
+
+    scheduler.start()
+
+    # The executor refuses new jobs once the interpreter is shutting down, after the main thread returns.
+    scheduler.join()
+
+
+def worker(engine, port, sites, shard, shards):
+    # Sites are sharded as a whole, so that the tickers and the accounts of a site share the session and the limits.
+    sites = dict((site, sites[site]) for index, site in enumerate(sorted(sites.keys())) if index % shards == shard)
+
+    run(engine, sites=sites, port=port + shard)
+
+
+def launch(engine, workers, sites, host=getenv('metric_host', 'localhost'), port=getenv('metric_port', 10001)):
+    # Quotes are shared by the workers on a board file, inherited by the spawned workers through the environment.
+    board = getenv('price_board_path', path.join(gettempdir(), 'cryptotheus-%s.board' % port))
+
+    # Quotes of the previous runs are not carried over.
+    if path.exists(board):
+        remove(board)
+
+    environ['price_board_path'] = board
+
+    context = cryptotheus.Context(board=board)
+
+    # Workers listen on the following ports, scraped and merged by the launcher on each scrape.
+    base = int(getenv('worker_port', int(port) + 1))
+
+    urls = ['http://localhost:%s/metrics' % (base + shard) for shard in range(workers)]
+
+    context.get_logger(context).info('Starting aggregate server [%s:%s] : workers=%s', host, port, workers)
+
+    cryptotheus.start_aggregate_server(int(port), host, cryptotheus.ShardCollector(urls))
+
+    context.follow_board()
+
+    supervisor = cryptotheus.ShardSupervisor(context, worker, (engine, base, sites), workers)
+    supervisor.start()
+
+    # Blocks while supervised, the workers unpickle the worker function from this module by name.
+    supervisor.join()
+
+
+def main(engine=getenv('cryptotheus_engine', 'thread'), workers=getenv('cryptotheus_workers', 1),
+         only=getenv('cryptotheus_only', None)):
+    # Validated upfront, an unknown site fails before any server is started.
+    sites = cryptotheus.Registry().select(only)
+
+    if int(workers) > 1:
+        launch(engine, int(workers), sites)
+    else:
+        run(engine, sites=sites)
@@ -0,0 +1,140 @@
+from asyncio import sleep
+from enum import IntEnum
+from heapq import heapify, heappush
+from itertools import count
+from threading import Condition
+from time import monotonic
+
+from prometheus_client import Counter, Histogram
+
+
+class Priority(IntEnum):
+    # Lower is served first, while waiting for the tokens.
+    ACCOUNT = 0
+    TICKER = 1
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket(object):
+    # Requests per second, with bursts up to the capacity. Shared by all the callers of the same site and scope.
+    __WAIT = Histogram('ratelimit_wait_seconds', 'Time waited for a request token',
+                       ['site', 'scope', 'priority'], buckets=(.001, .01, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+    __REJECTED = Counter('ratelimit_rejected', 'Requests rejected, without a token before the deadline',
+                         ['site', 'scope', 'priority'])
+
+    def __init__(self, site, scope, rate, burst):
+        self.__site = site
+        self.__scope = scope
+        self.__rate = float(rate)
+        self.__burst = float(burst)
+        self.__tokens = self.__burst
+        self.__stamp = monotonic()
+        self.__condition = Condition()
+        self.__waiters = []
+        self.__sequence = count()
+
+    def get_rate(self):
+        return self.__rate
+
+    def get_burst(self):
+        return self.__burst
+
+    def __refill(self, now):
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__stamp) * self.__rate)
+        self.__stamp = now
+
+    def acquire(self, priority=Priority.TICKER, timeout=None):
+
+        start = monotonic()
+
+        deadline = start + float(timeout) if timeout is not None else None
+
+        # Served by priority, then in arrival order.
+        entry = (int(priority), next(self.__sequence))
+
+        label = Priority(priority).name.lower()
+
+        with self.__condition:
+
+            heappush(self.__waiters, entry)
+
+            try:
+
+                while True:
+
+                    now = monotonic()
+
+                    self.__refill(now)
+
+                    if self.__waiters[0] == entry and self.__tokens >= 1:
+                        self.__tokens = self.__tokens - 1
+                        break
+
+                    if deadline is not None and now >= deadline:
+                        TokenBucket.__REJECTED.labels(self.__site, self.__scope, label).inc()
+                        raise RateLimitExceeded('%s (%s) : waited %.3fs' % (self.__site, self.__scope, now - start))
+
+                    # Until the next token, or until notified by the head of the queue.
+                    wait = (1 - self.__tokens) / self.__rate if self.__tokens < 1 else None
+
+                    if deadline is not None:
+                        wait = min(wait, deadline - now) if wait is not None else deadline - now
+
+                    self.__condition.wait(wait)
+
+            finally:
+
+                self.__waiters.remove(entry)
+                heapify(self.__waiters)
+                self.__condition.notify_all()
+
+        TokenBucket.__WAIT.labels(self.__site, self.__scope, label).observe(monotonic() - start)
+
+    async def acquire_async(self, priority=Priority.TICKER, timeout=None):
+
+        start = monotonic()
+
+        deadline = start + float(timeout) if timeout is not None else None
+
+        label = Priority(priority).name.lower()
+
+        while True:
+
+            with self.__condition:
+
+                now = monotonic()
+
+                self.__refill(now)
+
+                # Behind the threads waiting with the same or a higher priority.
+                queued = any(entry[0] <= int(priority) for entry in self.__waiters)
+
+                wait = (1 - self.__tokens) / self.__rate if self.__tokens < 1 else 0.0
+
+                if not queued and (deadline is None or now + wait <= deadline):
+                    # Reserved upfront, the coroutine sleeps until refilled instead of holding a thread.
+                    self.__tokens = self.__tokens - 1
+                    break
+
+                if deadline is not None and (not queued or now >= deadline):
+                    TokenBucket.__REJECTED.labels(self.__site, self.__scope, label).inc()
+                    raise RateLimitExceeded('%s (%s) : waited %.3fs' % (self.__site, self.__scope, now - start))
+
+            retry = max(wait, 1 / self.__rate)
+
+            await sleep(min(retry, deadline - now) if deadline is not None else retry)
+
+        if wait > 0:
+            await sleep(wait)
+
+        TokenBucket.__WAIT.labels(self.__site, self.__scope, label).observe(monotonic() - start)
+
+    def penalize(self, seconds):
+
+        # Throttled by the exchange anyway, hold back the next requests until the given delay.
+        with self.__condition:
+            self.__refill(monotonic())
+            self.__tokens = min(self.__tokens, -float(seconds) * self.__rate)
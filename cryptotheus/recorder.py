@@ -0,0 +1,254 @@
+from mmap import ACCESS_READ, mmap
+from os import fsync, getpid, makedirs, path
+from struct import Struct
+from threading import Lock, Thread
+from time import gmtime, sleep, strftime, time
+
+from prometheus_client import Counter
+
+# File header : magic, version
+_HEADER = Struct('<8sI4x')
+
+# Block header : magic, rows, new sites, new products, new codes, followed by the dictionary entries and the columns.
+_BLOCK = Struct('<4sIHHH2x')
+
+# Dictionary entry : length, followed by the utf-8 name.
+_ENTRY = Struct('<H')
+
+_MAGIC = b'CRYPTICK'
+_BLOCK_MAGIC = b'BLCK'
+_VERSION = 2
+
+# Columns in the order within a block, 8-byte columns first to keep them aligned.
+COLUMNS = [
+    ('timestamp', 'd'),
+    ('ask', 'd'),
+    ('bid', 'd'),
+    ('mid', 'd'),
+    ('ltp', 'd'),
+    ('site', 'H'),
+    ('product', 'H'),
+    ('code', 'H'),
+]
+
+_DTYPES = {'d': '<f8', 'H': '<u2'}
+_SIZES = {'d': 8, 'H': 2}
+
+
+def _padding(size):
+    return (8 - size % 8) % 8
+
+
+class TickRecorder(Thread):
+    # Quotes appended per block of rows, one block per flush. Site, product and code names are dictionary-encoded,
+    # and each file carries its own dictionaries, so that the rotated files are readable on their own.
+    __ROWS = None
+    __BYTES = None
+    __LCK = Lock()
+
+    def __init__(self, context, directory, rotate=64 * 1024 * 1024, flush=1.0):
+        super(TickRecorder, self).__init__(daemon=True)
+        self.__context = context
+        self.__directory = directory
+        self.__rotate = int(rotate)
+        self.__flush = float(flush)
+        self.__lock = Lock()
+        self.__pending = []
+        self.__file = None
+        self.__sites = {}
+        self.__products = {}
+        self.__codes = {}
+
+        # Only exported while recording.
+        with TickRecorder.__LCK:
+
+            if TickRecorder.__ROWS is None:
+                TickRecorder.__ROWS = Counter('tick_recorded_rows', 'Quotes appended to the tick files')
+                TickRecorder.__BYTES = Counter('tick_recorded_bytes', 'Bytes appended to the tick files')
+
+    def record(self, site, product, code, timestamp, ask, bid, mid, ltp):
+        with self.__lock:
+            self.__pending.append((timestamp, ask, bid, mid, ltp, site, product, code))
+
+    def on_quote(self, site, product, code, quote):
+        self.record(site, product.name, code, time(), quote[0], quote[1], quote[2], quote[3])
+
+    def run(self):
+
+        while self.__context.is_active():
+
+            sleep(self.__flush)
+
+            try:
+
+                self.flush()
+
+            except Exception as e:
+
+                self.__context.get_logger(self).warn('%s : %s', type(e), e.args)
+
+        self.flush()
+
+        if self.__file is not None:
+            self.__file.close()
+
+    def __open(self):
+
+        if self.__file is not None:
+            self.__file.close()
+
+        makedirs(self.__directory, exist_ok=True)
+
+        now = time()
+
+        name = 'ticks-%s%03d-%s.bin' % (strftime('%Y%m%dT%H%M%S', gmtime(now)), int(now * 1000) % 1000, getpid())
+
+        self.__file = open(path.join(self.__directory, name), 'ab')
+        self.__file.write(_HEADER.pack(_MAGIC, _VERSION))
+        self.__sites = {}
+        self.__products = {}
+        self.__codes = {}
+
+        self.__context.get_logger(self).info('Recording ticks [%s]', name)
+
+    def __encode(self, dictionary, name, entries):
+
+        index = dictionary[name] if name in dictionary else None
+
+        if index is None:
+            index = len(dictionary)
+            dictionary[name] = index
+            encoded = name.encode('utf-8')
+            entries.append(_ENTRY.pack(len(encoded)) + encoded)
+
+        return index
+
+    def flush(self):
+
+        with self.__lock:
+            rows = self.__pending
+            self.__pending = []
+
+        if len(rows) == 0:
+            return
+
+        if self.__file is None or self.__file.tell() >= self.__rotate:
+            self.__open()
+
+        sites = []
+        products = []
+        codes = []
+
+        rows = [row[:5] + (self.__encode(self.__sites, row[5], sites),
+                           self.__encode(self.__products, row[6], products),
+                           self.__encode(self.__codes, row[7], codes)) for row in rows]
+
+        head = _BLOCK.pack(_BLOCK_MAGIC, len(rows), len(sites), len(products), len(codes))
+        head = head + b''.join(sites) + b''.join(products) + b''.join(codes)
+
+        chunks = [head, b'\0' * _padding(len(head))]
+
+        for index, (name, kind) in enumerate(COLUMNS):
+            column = Struct('<%d%s' % (len(rows), kind)).pack(*[row[index] for row in rows])
+            chunks.append(column)
+            chunks.append(b'\0' * _padding(len(column)))
+
+        data = b''.join(chunks)
+
+        self.__file.write(data)
+        self.__file.flush()
+
+        # Batched, once per flush interval instead of per quote.
+        fsync(self.__file.fileno())
+
+        TickRecorder.__ROWS.inc(len(rows))
+        TickRecorder.__BYTES.inc(len(data))
+
+
+class TickReader(object):
+    # Memory-mapped columns of a tick file, as NumPy arrays. (requires numpy)
+
+    def __init__(self, filename):
+        self.__handle = open(filename, 'rb')
+        self.__map = mmap(self.__handle.fileno(), 0, access=ACCESS_READ)
+        self.__sites = []
+        self.__products = []
+        self.__codes = []
+        self.__blocks = []
+
+        magic, version = _HEADER.unpack_from(self.__map, 0)
+
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Invalid tick file : %s' % filename)
+
+        offset = _HEADER.size
+
+        while offset + _BLOCK.size <= len(self.__map):
+
+            magic, rows, sites, products, codes = _BLOCK.unpack_from(self.__map, offset)
+
+            if magic != _BLOCK_MAGIC:
+                break
+
+            position = offset + _BLOCK.size
+
+            names = []
+
+            for _ in range(sites + products + codes):
+                length = _ENTRY.unpack_from(self.__map, position)[0]
+                names.append(self.__map[position + _ENTRY.size:position + _ENTRY.size + length].decode('utf-8'))
+                position = position + _ENTRY.size + length
+
+            position = position + _padding(position - offset)
+
+            columns = {}
+
+            for name, kind in COLUMNS:
+                columns[name] = position
+                position = position + rows * _SIZES[kind]
+                position = position + _padding(rows * _SIZES[kind])
+
+            # Truncated by a crash while appending, the complete blocks are still readable.
+            if position > len(self.__map):
+                break
+
+            self.__sites.extend(names[:sites])
+            self.__products.extend(names[sites:sites + products])
+            self.__codes.extend(names[sites + products:])
+            self.__blocks.append((rows, columns))
+
+            offset = position
+
+    def get_sites(self):
+        return list(self.__sites)
+
+    def get_products(self):
+        return list(self.__products)
+
+    def get_codes(self):
+        return list(self.__codes)
+
+    def get_rows(self):
+        return sum(rows for rows, columns in self.__blocks)
+
+    def get_column(self, name):
+
+        # Optional dependency, only required for reading.
+        from numpy import concatenate, dtype, empty, frombuffer
+
+        kind = dict(COLUMNS)[name]
+
+        views = [frombuffer(self.__map, dtype=dtype(_DTYPES[kind]), count=rows, offset=columns[name])
+                 for rows, columns in self.__blocks]
+
+        if len(views) == 1:
+            return views[0]
+
+        return concatenate(views) if len(views) > 0 else empty(0, dtype=dtype(_DTYPES[kind]))
+
+    def get_columns(self):
+        return dict((name, self.get_column(name)) for name, kind in COLUMNS)
+
+    def close(self):
+        self.__map.close()
+        self.__handle.close()
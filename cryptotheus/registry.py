@@ -0,0 +1,104 @@
+from importlib import import_module
+
+ROLES = ('ticker', 'account', 'stream')
+
+# Site -> role -> 'module:attribute', imported only once the site is enabled.
+MODULES = {
+    'bitfinex': {
+        'ticker': 'cryptotheus.ticker_bitfinex:BitfinexTicker',
+    },
+    'bitflyer': {
+        'ticker': 'cryptotheus.ticker_bitflyer:BitflyerTicker',
+        'account': 'cryptotheus.account_bitflyer:BitflyerAccount',
+        'stream': 'cryptotheus.stream_bitflyer:BitflyerStream',
+    },
+    'bitmex': {
+        'ticker': 'cryptotheus.ticker_bitmex:BitmexTicker',
+        'account': 'cryptotheus.account_bitmex:BitmexAccount',
+        'stream': 'cryptotheus.stream_bitmex:BitmexStream',
+    },
+    'coincheck': {
+        'ticker': 'cryptotheus.ticker_coincheck:CoincheckTicker',
+    },
+    'oanda': {
+        'ticker': 'cryptotheus.ticker_oanda:OandaTicker',
+    },
+    'poloniex': {
+        'ticker': 'cryptotheus.ticker_poloniex:PoloniexTicker',
+    },
+    'quoine': {
+        'ticker': 'cryptotheus.ticker_quoine:QuoineTicker',
+    },
+    'zaif': {
+        'ticker': 'cryptotheus.ticker_zaif:ZaifTicker',
+    },
+}
+
+
+class Registry(object):
+    # Built-in sites, plus the ones declared by the other distributions as the entry points.
+    # (e.g. group 'cryptotheus.tickers', name 'mysite', value 'mypackage.ticker:MyTicker')
+
+    def __init__(self, modules=MODULES, discover=True):
+        self.__modules = dict((site, dict(roles)) for site, roles in modules.items())
+
+        if discover:
+            self.__discover()
+
+    def __discover(self):
+
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return
+
+        points = entry_points()
+
+        for role in ROLES:
+
+            group = 'cryptotheus.%ss' % role
+
+            # Selectable since 3.10, a dict of the groups before.
+            selected = points.select(group=group) if hasattr(points, 'select') else points.get(group, [])
+
+            for point in selected:
+                self.__modules.setdefault(point.name, {})[role] = point.value
+
+    def get_sites(self):
+        return sorted(self.__modules.keys())
+
+    def select(self, only=None):
+        # 'site' or 'site:role' tokens, comma-separated. Site -> roles, in the order of the sites.
+
+        if only is None or len(str(only).strip()) == 0:
+            return dict((site, set(self.__modules[site].keys())) for site in self.get_sites())
+
+        selected = {}
+
+        for token in (t.strip() for t in str(only).split(',') if len(t.strip()) > 0):
+
+            site, role = token.split(':', 1) if ':' in token else (token, None)
+
+            if site not in self.__modules:
+                raise ValueError('Unknown site : %s (%s)' % (site, ', '.join(self.get_sites())))
+
+            if role is not None and role not in self.__modules[site]:
+                raise ValueError('Unknown role : %s (%s)' % (token, ', '.join(sorted(self.__modules[site].keys()))))
+
+            roles = selected.setdefault(site, set())
+            roles.update([role] if role is not None else self.__modules[site].keys())
+
+        return dict((site, selected[site]) for site in sorted(selected.keys()))
+
+    def load(self, site, role):
+
+        roles = self.__modules[site] if site in self.__modules else {}
+
+        target = roles[role] if role in roles else None
+
+        if target is None:
+            return None
+
+        module, attribute = target.split(':', 1)
+
+        return getattr(import_module(module), attribute)
@@ -0,0 +1,212 @@
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil, floor
+from os import getenv
+from random import uniform
+from threading import Lock, Thread
+from time import perf_counter, sleep, time
+from zlib import crc32
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from cryptotheus.adaptive import AdaptiveInterval
+
+
+class _Job(object):
+    def __init__(self, name, target, submit, interval, jitter, phase, align, policy):
+        self.name = name
+        self.target = target
+        self.submit = submit
+        self.interval = interval
+        self.spread = jitter
+        self.jitter = min(jitter, interval)
+        self.phase = phase
+        self.align = align
+        self.policy = policy
+        self.deadline = None
+        self.fire = None
+        self.future = None
+
+
+class Scheduler(Thread):
+    __MISSED = Counter('scheduler_missed', 'Poll deadlines missed, while the previous cycle was running', ['job'])
+    __LATENESS = Gauge('scheduler_lateness_seconds', 'Delay between the firing time and the dispatch', ['job'])
+    __INTERVAL = Gauge('scheduler_interval_seconds', 'Current polling interval', ['job'])
+    __CYCLE = Histogram('poll_cycle_seconds', 'Duration of a poll cycle', ['job'],
+                        buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 15, 30, 60))
+
+    def __init__(self, context,
+                 tick=getenv('scheduler_tick', 0.1),
+                 slots=getenv('scheduler_slots', 512),
+                 workers=getenv('scheduler_workers', 8),
+                 jitter=getenv('scheduler_jitter', 0.5),
+                 align=getenv('scheduler_align', 'false'),
+                 lead=getenv('scheduler_lead', 5)
+                 ):
+        super(Scheduler, self).__init__()
+        self.__context = context
+        self.__tick = float(tick)
+        self.__wheel = [[] for _ in range(int(slots))]
+        self.__executor = ThreadPoolExecutor(max_workers=int(workers))
+        self.__jitter = float(jitter)
+        self.__align = str(align).lower() in ('true', '1', 'yes')
+        self.__lead = float(lead)
+        self.__lock = Lock()
+        self.__origin = None
+        self.__cursor = 0
+
+    def add(self, target, submit=None, interval=None, delay=0.0, jitter=None, phase=None, align=None, adaptive=False):
+
+        name = target.__class__.__name__
+        interval = float(interval if interval is not None else target.get_interval())
+        jitter = float(getenv(name + '_jitter', self.__jitter) if jitter is None else jitter)
+        align = self.__align if align is None else align
+
+        if phase is None:
+            # Deterministic spread, so that the exchanges do not fire in lockstep.
+            phase = getenv(name + '_phase', (crc32(name.encode()) % 1000) * interval / 1000)
+
+        # Interval adjusted after each cycle, from the quotes and the rate limits of the site.
+        policy = AdaptiveInterval(self.__context, target, interval) if adaptive else None
+
+        job = _Job(name, target, submit, interval, jitter, float(phase), align, policy)
+
+        Scheduler.__INTERVAL.labels(name).set(interval)
+
+        with self.__lock:
+            self.__schedule(job, time() + float(delay) + job.phase)
+
+        self.__context.get_logger(self).info('Job [%s] : interval=%s phase=%.3f jitter=%s align=%s adaptive=%s',
+                                             name, interval, job.phase, job.jitter, align, adaptive)
+
+        return job
+
+    def __next_deadline(self, job, now):
+
+        if job.policy is not None:
+            job.interval = job.policy.get_interval()
+            job.jitter = min(job.spread, job.interval)
+            Scheduler.__INTERVAL.labels(job.name).set(job.interval)
+
+        deadline = job.deadline + job.interval
+
+        if job.align:
+
+            scrape = self.__context.get_last_scrape()
+
+            if scrape is not None:
+                # Shift the grid so that one of the samples lands just before the next scrape.
+                anchor = scrape - self.__lead
+                deadline = anchor + (floor((now - anchor) / job.interval) + 1) * job.interval
+
+        if deadline + job.interval < now:
+
+            # Fell behind for multiple ticks, skip ahead instead of bursting.
+            skipped = int((now - deadline) // job.interval)
+            Scheduler.__MISSED.labels(job.name).inc(skipped)
+            deadline = deadline + skipped * job.interval
+
+        return deadline
+
+    def __schedule(self, job, deadline):
+
+        job.deadline = deadline
+
+        if self.__origin is None:
+            self.__origin = time()
+
+        # Jitter is applied to the firing time only, the fixed-rate grid is kept intact.
+        job.fire = deadline + (uniform(0, job.jitter) if job.jitter > 0 else 0.0)
+
+        ticks = max(int(ceil((job.fire - self.__origin) / self.__tick)), self.__cursor + 1)
+
+        self.__wheel[ticks % len(self.__wheel)].append((ticks, job))
+
+    def __dispatch(self, job, now):
+
+        log = self.__context.get_logger(self)
+
+        if job.future is not None and not job.future.done():
+
+            Scheduler.__MISSED.labels(job.name).inc()
+
+            log.warn('Missed deadline : %s', job.name)
+
+        else:
+
+            Scheduler.__LATENESS.labels(job.name).set(max(now - job.fire, 0.0))
+
+            try:
+
+                if job.submit is not None:
+                    start = perf_counter()
+                    job.future = job.submit(job.target)
+                    cycle = Scheduler.__CYCLE.labels(job.name)
+                    job.future.add_done_callback(lambda f: self.__complete(job, cycle, perf_counter() - start))
+                else:
+                    job.future = self.__executor.submit(self.__execute, job)
+
+            except Exception as e:
+
+                log.warn('%s : %s', type(e), e.args)
+
+        self.__schedule(job, self.__next_deadline(job, now))
+
+    def __execute(self, job):
+
+        start = perf_counter()
+
+        try:
+
+            job.target.poll()
+
+        except Exception as e:
+
+            self.__context.get_logger(self).warn('%s : %s - %s', job.name, type(e), e.args)
+
+        self.__complete(job, Scheduler.__CYCLE.labels(job.name), perf_counter() - start)
+
+    def __complete(self, job, cycle, elapsed):
+
+        cycle.observe(elapsed)
+
+        if job.policy is None:
+            return
+
+        try:
+
+            job.policy.update()
+
+        except Exception as e:
+
+            self.__context.get_logger(self).warn('%s : %s - %s', job.name, type(e), e.args)
+
+    def run(self):
+
+        with self.__lock:
+            if self.__origin is None:
+                self.__origin = time()
+
+        while self.__context.is_active():
+
+            with self.__lock:
+
+                self.__cursor = self.__cursor + 1
+
+                slot = self.__wheel[self.__cursor % len(self.__wheel)]
+
+                due = [job for ticks, job in slot if ticks <= self.__cursor]
+
+                slot[:] = [(ticks, job) for ticks, job in slot if ticks > self.__cursor]
+
+                now = time()
+
+                for job in due:
+                    self.__dispatch(job, now)
+
+                # Fixed-rate ticks of the wheel itself, no drift from the dispatch time.
+                wait = self.__origin + (self.__cursor + 1) * self.__tick - time()
+
+            if wait > 0:
+                sleep(wait)
+
+        self.__executor.shutdown(wait=False)
@@ -0,0 +1,247 @@
+from time import perf_counter, time
+from zlib import crc32
+from urllib.parse import urlparse
+
+from prometheus_client import Counter, Histogram
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+from cryptotheus.decode import loads
+from cryptotheus.limiter import Priority
+
+
+class _CountingPool(object):
+    # Injected per site
+    site = None
+    counter = None
+
+    def _get_conn(self, timeout=None):
+        conn = super(_CountingPool, self)._get_conn(timeout=timeout)
+
+        # Pooled connections keep their socket, fresh (or dropped) ones connect on first use.
+        state = 'reused' if getattr(conn, 'sock', None) is not None else 'opened'
+        self.counter.labels(self.site, state).inc()
+
+        return conn
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, site, counter, pool_size):
+        self.__pools = {
+            'http': type('CountingHTTPConnectionPool', (_CountingPool, HTTPConnectionPool),
+                         {'site': site, 'counter': counter}),
+            'https': type('CountingHTTPSConnectionPool', (_CountingPool, HTTPSConnectionPool),
+                          {'site': site, 'counter': counter}),
+        }
+        super(_CountingAdapter, self).__init__(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_CountingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.__pools
+
+
+class SiteSession(object):
+    __CONNECTIONS = Counter('http_connections', 'HTTP connections acquired per site', ['site', 'state'])
+    __LATENCY = Histogram('http_request_seconds', 'HTTP request latency, until the body is read',
+                          ['site', 'endpoint'], buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+    __BYTES = Histogram('http_response_bytes', 'HTTP response body size',
+                        ['site', 'endpoint'], buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+    __DECODE = Histogram('http_decode_seconds', 'JSON decode time of the response body',
+                         ['site', 'endpoint'], buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5))
+    __ERRORS = Counter('http_errors', 'HTTP failures by exception type or status', ['site', 'endpoint', 'type'])
+    __UNCHANGED = Counter('http_unchanged', 'HTTP responses unchanged since the previous one, not decoded again',
+                          ['site', 'endpoint', 'reason'])
+    __MAX_RESPONSES = 256
+
+    def __init__(self, site, pool_size=4, keepalive=True, timeout=10.0, public=None, private=None, deadline=None):
+        self.__site = site
+        self.__pool_size = int(pool_size)
+        self.__keepalive = keepalive
+        self.__timeout = float(timeout)
+        self.__responses = {}
+        self.__limits = {False: None, True: None}
+        self.__buckets = {False: public, True: private}
+        self.__deadline = float(deadline) if deadline is not None else None
+
+        adapter = _CountingAdapter(site, SiteSession.__CONNECTIONS, self.__pool_size)
+
+        self.__session = Session()
+        self.__session.mount('http://', adapter)
+        self.__session.mount('https://', adapter)
+
+        if not keepalive:
+            self.__session.headers['Connection'] = 'close'
+
+    def get_site(self):
+        return self.__site
+
+    def request(self, method, url, headers=None, data=None):
+        return self.__session.request(method, url, headers=headers, data=data, timeout=self.__timeout)
+
+    def acquire(self, private=False, priority=Priority.TICKER, deadline=None):
+
+        bucket = self.__buckets[bool(private)]
+
+        if bucket is None:
+            return
+
+        # Seconds to wait for a token at most, the redundant polls are dropped instead of queueing up.
+        bucket.acquire(priority=priority, timeout=deadline if deadline is not None else self.__deadline)
+
+    async def acquire_async(self, private=False, priority=Priority.TICKER, deadline=None):
+
+        bucket = self.__buckets[bool(private)]
+
+        if bucket is None:
+            return
+
+        await bucket.acquire_async(priority=priority, timeout=deadline if deadline is not None else self.__deadline)
+
+    def get_json(self, url, headers=None, select=None, private=False, priority=Priority.TICKER, deadline=None,
+                 acquired=False):
+
+        endpoint = urlparse(url).path
+
+        if not acquired:
+            self.acquire(private=private, priority=priority, deadline=deadline)
+
+        start = perf_counter()
+
+        try:
+
+            response = self.request('GET', url, headers=self.conditional(url, headers))
+
+            content = response.content
+
+        except Exception as e:
+
+            self.record_error(endpoint, e)
+
+            raise
+
+        etag = response.headers.get('ETag')
+
+        self.record_limits(response.headers, status=response.status_code, private=private)
+
+        return self.parse(url, response.status_code, perf_counter() - start, content, select=select, etag=etag)
+
+    def conditional(self, url, headers=None):
+
+        previous = self.__responses[url] if url in self.__responses else None
+
+        if previous is None or previous[0] is None:
+            return headers
+
+        # Revalidate against the previous response, if the endpoint supports ETag.
+        headers = dict(headers) if headers is not None else {}
+        headers['If-None-Match'] = previous[0]
+
+        return headers
+
+    def parse(self, url, status, elapsed, content, select=None, etag=None):
+
+        endpoint = urlparse(url).path
+
+        SiteSession.__LATENCY.labels(self.__site, endpoint).observe(elapsed)
+        SiteSession.__BYTES.labels(self.__site, endpoint).observe(len(content))
+
+        # (etag, digest, select, json) of the previous successful response.
+        previous = self.__responses[url] if url in self.__responses else None
+
+        if status == 304 and previous is not None:
+            SiteSession.__UNCHANGED.labels(self.__site, endpoint, 'etag').inc()
+            return previous[3]
+
+        if status >= 400:
+            SiteSession.__ERRORS.labels(self.__site, endpoint, 'HTTP%s' % status).inc()
+
+        digest = crc32(content)
+
+        if status == 200 and previous is not None and previous[1] == digest and previous[2] is select:
+            SiteSession.__UNCHANGED.labels(self.__site, endpoint, 'hash').inc()
+            return previous[3]
+
+        start = perf_counter()
+
+        try:
+
+            # Selective decode of the targeted elements only, if specified by the source.
+            json = select(content) if select is not None else loads(content)
+
+        except Exception as e:
+
+            self.record_error(endpoint, e)
+
+            raise
+
+        SiteSession.__DECODE.labels(self.__site, endpoint).observe(perf_counter() - start)
+
+        if status == 200:
+
+            if url not in self.__responses and len(self.__responses) >= self.__MAX_RESPONSES:
+                # Bounded, since the paged private endpoints produce distinct urls.
+                self.__responses.clear()
+
+            self.__responses[url] = (etag, digest, select, json)
+
+        return json
+
+    def record_limits(self, headers, status=200, private=False):
+
+        remaining = headers.get('X-RateLimit-Remaining')
+
+        try:
+
+            reset = headers.get('X-RateLimit-Reset')
+            reset = float(reset) if reset is not None else None
+
+            # Either epoch seconds or seconds until the reset, depending on the exchange.
+            reset = reset + time() if reset is not None and reset < 1e9 else reset
+
+            # Per bucket, since the private and the public endpoints are limited separately.
+            if remaining is not None:
+                self.__limits[bool(private)] = (float(remaining), reset)
+
+            bucket = self.__buckets[bool(private)]
+
+            if status == 429 and bucket is not None:
+                retry = headers.get('Retry-After')
+                retry = float(retry) if retry is not None else (reset - time() if reset is not None else 1.0)
+                bucket.penalize(max(retry, 0.0))
+
+        except ValueError:
+
+            pass
+
+    def get_limits(self, private=False):
+        # (remaining requests, reset epoch seconds) of the latest response, None if not provided.
+        return self.__limits[bool(private)]
+
+    def record_error(self, endpoint, e):
+        SiteSession.__ERRORS.labels(self.__site, endpoint, type(e).__name__).inc()
+
+    def create_async(self):
+
+        # Optional dependency, only required by the asyncio engine.
+        from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+        opened = SiteSession.__CONNECTIONS.labels(self.__site, 'opened')
+
+        async def on_create(session, context, params):
+            opened.inc()
+
+        reused = SiteSession.__CONNECTIONS.labels(self.__site, 'reused')
+
+        async def on_reuse(session, context, params):
+            reused.inc()
+
+        trace = TraceConfig()
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+
+        return ClientSession(
+            connector=TCPConnector(limit=self.__pool_size, force_close=not self.__keepalive),
+            timeout=ClientTimeout(total=self.__timeout),
+            trace_configs=[trace],
+        )
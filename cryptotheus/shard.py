@@ -0,0 +1,149 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing import get_context
+from socketserver import ThreadingMixIn
+from threading import Thread
+from time import sleep, time
+from urllib.request import urlopen
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, generate_latest
+from prometheus_client.core import Metric
+from prometheus_client.parser import text_string_to_metric_families
+
+
+class ShardCollector(object):
+    # Families merged by name across the processes, every sample labelled by the shard it was exported from,
+    # so that the same series exported by more than one process never collide. (e.g. process_*, *_created)
+
+    def __init__(self, urls, timeout=5.0):
+        self.__urls = list(urls)
+        self.__timeout = float(timeout)
+
+    def describe(self):
+        return []
+
+    def __fetch(self, url):
+        try:
+            return list(text_string_to_metric_families(urlopen(url, timeout=self.__timeout).read().decode('utf-8')))
+        except Exception:
+            # Down or restarting, the series of the shard are absent until it is back.
+            return []
+
+    def collect(self):
+
+        sources = [('launcher', list(REGISTRY.collect()))]
+
+        for index, url in enumerate(self.__urls):
+            sources.append((str(index), self.__fetch(url)))
+
+        merged = {}
+
+        for shard, families in sources:
+
+            for family in families:
+
+                metric = merged[family.name] if family.name in merged else None
+
+                if metric is None:
+                    metric = Metric(family.name, family.documentation, family.type)
+                    merged[family.name] = metric
+
+                for sample in family.samples:
+                    # Already labelled per shard by the launcher. (e.g. shard_up)
+                    labels = sample[1] if 'shard' in sample[1] else dict(sample[1], shard=shard)
+                    metric.add_sample(sample[0], labels, sample[2])
+
+        return list(merged.values())
+
+
+class _AggregateServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_aggregate_server(port, addr, collector):
+    registry = CollectorRegistry()
+    registry.register(collector)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            output = generate_latest(registry)
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE_LATEST)
+            self.end_headers()
+            self.wfile.write(output)
+
+        def log_message(self, *args):
+            pass
+
+    server = _AggregateServer((addr, port), Handler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
+
+
+class ShardSupervisor(Thread):
+    __UP = Gauge('shard_up', 'Worker process state per shard', ['shard'])
+    __RESTARTS = Counter('shard_restarts', 'Worker process restarts per shard', ['shard'])
+
+    def __init__(self, context, target, args, shards, backoff=30):
+        super(ShardSupervisor, self).__init__()
+        self.__context = context
+        self.__target = target
+        self.__args = tuple(args)
+        self.__shards = int(shards)
+        self.__backoff = float(backoff)
+        self.__spawn = get_context('spawn')
+        self.__processes = [None] * self.__shards
+        self.__delays = [1.0] * self.__shards
+        self.__started = [None] * self.__shards
+
+    def __start(self, shard):
+
+        process = self.__spawn.Process(target=self.__target, args=self.__args + (shard, self.__shards),
+                                       name='cryptotheus-%s' % shard, daemon=True)
+        process.start()
+
+        self.__processes[shard] = process
+        self.__started[shard] = time()
+
+        ShardSupervisor.__UP.labels(str(shard)).set(1)
+
+        self.__context.get_logger(self).info('Started shard [%s/%s] : pid=%s', shard, self.__shards, process.pid)
+
+    def run(self):
+
+        log = self.__context.get_logger(self)
+
+        for shard in range(self.__shards):
+            self.__start(shard)
+
+        while self.__context.is_active():
+
+            sleep(1.0)
+
+            for shard, process in enumerate(self.__processes):
+
+                if process.is_alive():
+
+                    # Reset the backoff, once the worker has been running for a while.
+                    if time() - self.__started[shard] > self.__backoff:
+                        self.__delays[shard] = 1.0
+
+                    continue
+
+                ShardSupervisor.__UP.labels(str(shard)).set(0)
+
+                # Crash loops are throttled, by the minimum delay between the starts.
+                if time() - self.__started[shard] < self.__delays[shard]:
+                    continue
+
+                log.warn('Restarting shard [%s] : exitcode=%s', shard, process.exitcode)
+
+                ShardSupervisor.__RESTARTS.labels(str(shard)).inc()
+
+                self.__delays[shard] = min(self.__delays[shard] * 2, self.__backoff)
+
+                self.__start(shard)
+
+        for process in self.__processes:
+            process.terminate()
@@ -0,0 +1,14 @@
+from hashlib import sha256
+from hmac import new
+
+
+class HmacSigner(object):
+    # Keyed once, each signature is computed on a copy of the keyed state. Safe to share across the threads.
+
+    def __init__(self, secret, digest=sha256):
+        self.__keyed = new(str.encode(secret), digestmod=digest)
+
+    def sign(self, data):
+        mac = self.__keyed.copy()
+        mac.update(str.encode(data))
+        return mac.hexdigest()
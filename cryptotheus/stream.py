@@ -0,0 +1,150 @@
+from asyncio import TimeoutError, new_event_loop, sleep
+from json import dumps
+from os import getenv
+from threading import Thread
+from time import perf_counter
+
+from prometheus_client import Counter, Gauge
+
+from cryptotheus.decode import loads
+
+
+class WebSocketStream(Thread):
+    __CONNECTED = Gauge('stream_connected', 'WebSocket connection state per site', ['site'])
+    __CONNECTS = Counter('stream_connects', 'WebSocket connection attempts per site', ['site'])
+    __MESSAGES = Counter('stream_messages', 'WebSocket messages received per site', ['site'])
+
+    def __init__(self, context, site, endpoint,
+                 coalesce=getenv('stream_coalesce', 0.5),
+                 backoff=getenv('stream_backoff', 30),
+                 heartbeat=getenv('stream_heartbeat', 15)
+                 ):
+        super(WebSocketStream, self).__init__()
+        self.__context = context
+        self.__site = site
+        self.__endpoint = endpoint
+        self.__coalesce = float(coalesce)
+        self.__backoff = float(backoff)
+        self.__heartbeat = float(heartbeat)
+        self.__connected = False
+
+    def get_site(self):
+        return self.__site
+
+    def is_connected(self):
+        return self.__connected
+
+    def subscriptions(self):
+        # Messages sent on every (re)connection.
+        return []
+
+    def on_message(self, json):
+        pass
+
+    def on_disconnect(self):
+        pass
+
+    def flush(self):
+        # Coalesced updates, written at most once per interval.
+        pass
+
+    def run(self):
+
+        loop = new_event_loop()
+
+        try:
+
+            loop.run_until_complete(self.__connect_loop())
+
+        finally:
+
+            loop.close()
+
+    async def __connect_loop(self):
+
+        # Optional dependency, only required by the streaming mode.
+        from aiohttp import ClientSession
+
+        log = self.__context.get_logger(self)
+
+        delay = 1.0
+
+        async with ClientSession() as session:
+
+            while self.__context.is_active():
+
+                WebSocketStream.__CONNECTS.labels(self.__site).inc()
+
+                try:
+
+                    async with session.ws_connect(self.__endpoint, heartbeat=self.__heartbeat) as ws:
+
+                        for message in self.subscriptions():
+                            await ws.send_str(dumps(message))
+
+                        log.info('Connected : %s', self.__endpoint)
+
+                        self.__connected = True
+
+                        WebSocketStream.__CONNECTED.labels(self.__site).set(1)
+
+                        delay = 1.0
+
+                        await self.__receive_loop(ws)
+
+                except Exception as e:
+
+                    log.warn('%s : %s', type(e), e.args)
+
+                finally:
+
+                    self.__connected = False
+
+                    WebSocketStream.__CONNECTED.labels(self.__site).set(0)
+
+                    self.flush()
+
+                    self.on_disconnect()
+
+                if self.__context.is_active():
+
+                    await sleep(delay)
+
+                    # Exponential backoff, reset once connected.
+                    delay = min(delay * 2, self.__backoff)
+
+    async def __receive_loop(self, ws):
+
+        from aiohttp import WSMsgType
+
+        messages = WebSocketStream.__MESSAGES.labels(self.__site)
+
+        flushed = perf_counter()
+
+        while self.__context.is_active():
+
+            try:
+
+                message = await ws.receive(timeout=self.__coalesce)
+
+            except TimeoutError:
+
+                message = None
+
+            if message is not None:
+
+                if message.type == WSMsgType.TEXT:
+
+                    messages.inc()
+
+                    self.on_message(loads(message.data))
+
+                elif message.type in (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED, WSMsgType.ERROR):
+
+                    break
+
+            now = perf_counter()
+
+            if now - flushed >= self.__coalesce:
+                self.flush()
+                flushed = now
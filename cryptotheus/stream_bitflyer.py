@@ -0,0 +1,93 @@
+from os import getenv
+from time import time
+
+from cryptotheus.context import CryptotheusContext
+from cryptotheus.stream import WebSocketStream
+from cryptotheus.volume import parse_timestamp
+
+
+class BitflyerStream(WebSocketStream):
+    def __init__(self, context, targets,
+                 endpoint=getenv('bitflyer_stream_endpoint', 'wss://ws.lightstream.bitflyer.com/json-rpc'),
+                 stale=getenv('bitflyer_stream_stale', 15)
+                 ):
+        super(BitflyerStream, self).__init__(context, 'bitflyer', endpoint)
+        self.__context = context
+        self.__targets = dict(targets)
+        self.__stale = float(stale)
+        self.__pending = {}
+        self.__received = {}
+
+    def is_live(self, code):
+        # Codes without a recent message are left to the REST polling.
+        received = self.__received[code] if code in self.__received else None
+        return self.is_connected() and received is not None and time() - received < self.__stale
+
+    def subscriptions(self):
+        return [{
+            'jsonrpc': '2.0',
+            'id': index,
+            'method': 'subscribe',
+            'params': {'channel': 'lightning_ticker_' + code},
+        } for index, code in enumerate(sorted(self.__targets.keys()))]
+
+    def on_message(self, json):
+
+        if 'method' not in json or json['method'] != 'channelMessage':
+            return
+
+        message = json['params']['message'] if 'params' in json and 'message' in json['params'] else {}
+
+        code = message['product_code'] if 'product_code' in message else None
+
+        if code not in self.__targets:
+            return
+
+        # Only the latest message per code is kept, until the next flush.
+        self.__pending[code] = message
+        self.__received[code] = time()
+
+    def on_disconnect(self):
+        self.__received.clear()
+
+    def flush(self):
+
+        log = self.__context.get_logger(self)
+
+        pending = self.__pending
+        self.__pending = {}
+
+        for code, json in pending.items():
+            ltp = json['ltp'] if 'ltp' in json else None
+            ask = json['best_ask'] if 'best_ask' in json else None
+            bid = json['best_bid'] if 'best_bid' in json else None
+            ts = parse_timestamp(json['timestamp']) if 'timestamp' in json else None
+
+            log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+
+            gauges = self.__context.get_ticker_gauges(self.get_site(), self.__targets[code])
+            gauges.update_bbo(code, ask, bid, timestamp=ts)
+            gauges.update_ltp(code, ltp, timestamp=ts)
+
+
+def main():
+    from cryptotheus.scheduler import Scheduler
+    from cryptotheus.ticker_bitflyer import BitflyerTicker
+
+    context = CryptotheusContext(debug=True)
+    context.launch_server()
+
+    ticker = BitflyerTicker(context)
+
+    target = BitflyerStream(context, ticker.get_targets())
+    target.start()
+
+    ticker.set_stream(target)
+
+    scheduler = Scheduler(context)
+    scheduler.add(ticker)
+    scheduler.start()
+
+
+if __name__ == '__main__':
+    main()
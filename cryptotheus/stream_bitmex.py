@@ -0,0 +1,251 @@
+from os import getenv
+from threading import Lock, Thread
+from time import perf_counter
+
+from cryptotheus.context import CryptotheusContext
+from cryptotheus.stream import WebSocketStream
+
+
+class BitmexStream(WebSocketStream):
+    def __init__(self, context, targets, intervals,
+                 endpoint=getenv('bitmex_stream_endpoint', 'wss://www.bitmex.com/realtime'),
+                 rest=getenv('bitmex_endpoint', 'https://www.bitmex.com'),
+                 backoff=getenv('stream_backoff', 30)
+                 ):
+        super(BitmexStream, self).__init__(context, 'bitmex', endpoint)
+        self.__context = context
+        self.__targets = dict(targets)
+        self.__intervals = dict(intervals)
+        self.__rest = rest
+        self.__table = {}
+        self.__seeded = False
+        self.__mappings = None
+        self.__resolved = None
+        self.__dirty = set()
+        self.__lock = Lock()
+        self.__fetching = False
+        self.__generation = 0
+        self.__backoff = float(backoff)
+        self.__delay = 1.0
+        self.__retry = 0.0
+
+    def is_live(self):
+        return self.is_connected() and self.__seeded and self.__mappings is not None
+
+    def subscriptions(self):
+        return [{'op': 'subscribe', 'args': ['instrument']}]
+
+    def on_message(self, json):
+
+        if 'table' not in json or json['table'] != 'instrument' or 'data' not in json:
+            return
+
+        action = json['action'] if 'action' in json else None
+
+        if action == 'partial':
+
+            self.__table = dict((row['symbol'], row) for row in json['data'] if 'symbol' in row)
+            self.__seeded = True
+            self.__invalidate(mappings=True)
+
+        elif action == 'insert':
+
+            for row in json['data']:
+                self.__table[row['symbol']] = row
+
+            # New listings, the interval mappings may have rolled over.
+            self.__invalidate(mappings=True)
+
+        elif action == 'delete':
+
+            for row in json['data']:
+                self.__table.pop(row['symbol'], None)
+
+            self.__invalidate(mappings=True)
+
+        elif action == 'update':
+
+            for row in json['data']:
+
+                symbol = row['symbol'] if 'symbol' in row else None
+
+                if symbol not in self.__table:
+                    continue
+
+                self.__table[symbol].update(row)
+
+                if 'referenceSymbol' in row:
+                    self.__invalidate()
+
+                self.__dirty.add(symbol)
+
+    def on_disconnect(self):
+        # Seeded again by the partial of the next connection.
+        self.__seeded = False
+        self.__table = {}
+        self.__invalidate(mappings=True)
+
+    def __invalidate(self, mappings=False):
+
+        if mappings:
+            with self.__lock:
+                # Results of the fetches in flight are discarded.
+                self.__mappings = None
+                self.__generation = self.__generation + 1
+
+        self.__resolved = None
+
+    def __request_mappings(self):
+
+        # Fetched off the event loop, the token-bucket wait and the request would block the receive loop.
+        with self.__lock:
+
+            if self.__fetching or perf_counter() < self.__retry:
+                return
+
+            self.__fetching = True
+
+            generation = self.__generation
+
+        thread = Thread(target=self.__fetch_mappings, args=(generation,))
+        thread.daemon = True
+        thread.start()
+
+    def __fetch_mappings(self, generation):
+
+        log = self.__context.get_logger(self)
+
+        mappings = {}
+
+        try:
+
+            # Small and rarely required, on (re)connections and listing changes only.
+            session = self.__context.get_session(self.get_site())
+            json = session.get_json(self.__rest + '/api/v1/instrument/activeIntervals')
+
+            for index, interval in enumerate(json['intervals']):
+                mappings[interval] = json['symbols'][index]
+
+        except Exception as e:
+
+            log.warn('%s : %s', type(e), e.args)
+
+            mappings = None
+
+        with self.__lock:
+
+            self.__fetching = False
+
+            if mappings is None:
+                # Exponential backoff, reset once fetched.
+                self.__retry = perf_counter() + self.__delay
+                self.__delay = min(self.__delay * 2, self.__backoff)
+                return
+
+            self.__delay = 1.0
+
+            if generation == self.__generation:
+                self.__mappings = mappings
+                self.__resolved = None
+
+    def __resolve(self):
+
+        resolved = {}
+
+        for code, interval in self.__intervals.items():
+
+            symbol = self.__mappings[interval] if interval in self.__mappings else None
+
+            chain = []
+
+            instrument = self.__table[symbol] if symbol in self.__table else {}
+
+            while 'referenceSymbol' in instrument:
+
+                ref = instrument['referenceSymbol']
+
+                if 'symbol' not in instrument or ref == instrument['symbol'] or ref in chain:
+                    break
+
+                if ref not in self.__table:
+                    break
+
+                chain.append(ref)
+
+                instrument = self.__table[ref]
+
+            resolved[code] = (symbol, chain)
+
+        return resolved
+
+    def flush(self):
+
+        if not self.__seeded:
+            return
+
+        if self.__mappings is None:
+
+            self.__request_mappings()
+
+            return
+
+        if self.__resolved is None:
+
+            self.__resolved = self.__resolve()
+
+            # Everything is written once after a resolution.
+            self.__dirty = set(self.__table.keys())
+
+        log = self.__context.get_logger(self)
+
+        dirty = self.__dirty
+        self.__dirty = set()
+
+        for code, (symbol, chain) in self.__resolved.items():
+
+            gauges = self.__context.get_ticker_gauges(self.get_site(), self.__targets[code])
+
+            if symbol in dirty:
+                instrument = self.__table[symbol] if symbol in self.__table else {}
+                ask = instrument['askPrice'] if 'askPrice' in instrument else None
+                bid = instrument['bidPrice'] if 'bidPrice' in instrument else None
+                mid = instrument['midPrice'] if 'midPrice' in instrument else None
+                ltp = instrument['lastPrice'] if 'lastPrice' in instrument else None
+
+                gauges.update_bbo(code, ask, bid, mid=mid)
+                gauges.update_ltp(code, ltp)
+                log.debug('%s : ask=%s bid=%s mid=%s ltp=%s', code, ask, bid, mid, ltp)
+
+            for ref in chain:
+
+                if ref not in dirty:
+                    continue
+
+                instrument = self.__table[ref] if ref in self.__table else {}
+                ltp = instrument['markPrice'] if 'markPrice' in instrument else None
+
+                gauges.update_ltp(ref, ltp)
+                log.debug('%s : mrk=%s', ref, ltp)
+
+
+def main():
+    from cryptotheus.scheduler import Scheduler
+    from cryptotheus.ticker_bitmex import BitmexTicker
+
+    context = CryptotheusContext(debug=True)
+    context.launch_server()
+
+    ticker = BitmexTicker(context)
+
+    target = BitmexStream(context, ticker.get_targets(), ticker.get_intervals())
+    target.start()
+
+    ticker.set_stream(target)
+
+    scheduler = Scheduler(context)
+    scheduler.add(ticker)
+    scheduler.start()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,15 @@
 from os import getenv
 from threading import Thread
-from time import sleep
-
-from requests import get
 
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.scheduler import Scheduler
 
 
-class BitfinexTicker(Thread):
+class BitfinexTicker(object):
     def __init__(self, context,
                  endpoint=getenv('bitfinex_endpoint', 'https://api.bitfinex.com/v1/pubticker/'),
                  interval=getenv('bitfinex_interval', 15)
                  ):
-        super(BitfinexTicker, self).__init__()
         self.__site = 'bitfinex'
         self.__targets = {
             'btcusd': ProductType.USD_BTC,
@@ -21,48 +18,64 @@ class BitfinexTicker(Thread):
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
+
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code)
+
+    def get_site(self):
+        return self.__site
+
+    def get_interval(self):
+        return self.__interval
 
-    def run(self):
+    def get_requests(self):
+        return [(code, self.__endpoint + code, None, None) for code in self.__targets.keys()]
 
-        while self.__context.is_active():
+    def process(self, responses):
+        for code, product in self.__targets.items():
+            self.update(code, product, responses[code] if code in responses else None)
 
-            threads = []
+    def poll(self):
 
-            for code, product in self.__targets.items():
-                threads.append(Thread(daemon=True, target=self.fetch, args=[code, product]))
+        threads = []
 
-            for t in threads:
-                t.start()
+        for code, product in self.__targets.items():
+            threads.append(Thread(daemon=True, target=self.fetch, args=[code, product]))
 
-            for t in threads:
-                t.join()
+        for t in threads:
+            t.start()
 
-            sleep(self.__interval)
+        for t in threads:
+            t.join()
 
     def fetch(self, code, product):
 
         log = self.__context.get_logger(self)
-        ask = None
-        bid = None
-        mid = None
-        ltp = None
+        json = None
 
         try:
 
-            json = get(self.__endpoint + code).json()
-
-            ltp = json['last_price'] if 'last_price' in json else None
-            ask = json['ask'] if 'ask' in json else None
-            bid = json['bid'] if 'bid' in json else None
-            mid = json['mid'] if 'mid' in json else None
-
-            log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+            json = self.__context.get_session(self.__site).get_json(self.__endpoint + code)
 
         except Exception as e:
 
             log.warn('%s : %s', type(e), e.args)
 
+        self.update(code, product, json)
+
+    def update(self, code, product, json):
+
+        log = self.__context.get_logger(self)
+        json = json if json is not None else {}
+
+        ltp = json['last_price'] if 'last_price' in json else None
+        ask = json['ask'] if 'ask' in json else None
+        bid = json['bid'] if 'bid' in json else None
+        mid = json['mid'] if 'mid' in json else None
+
+        log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+
         gauges = self.__context.get_ticker_gauges(self.__site, product)
         gauges.update_bbo(code, ask, bid, mid)
         gauges.update_ltp(code, ltp)
@@ -73,7 +86,10 @@ def main():
     context.launch_server()
 
     target = BitfinexTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
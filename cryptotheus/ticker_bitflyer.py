@@ -1,18 +1,16 @@
 from os import getenv
 from threading import Thread
-from time import sleep
-
-from requests import get
 
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.scheduler import Scheduler
+from cryptotheus.volume import parse_timestamp
 
 
-class BitflyerTicker(Thread):
+class BitflyerTicker(object):
     def __init__(self, context,
                  endpoint=getenv('bitflyer_endpoint', 'https://api.bitflyer.jp'),
                  interval=getenv('bitflyer_interval', 15)
                  ):
-        super(BitflyerTicker, self).__init__()
         self.__site = 'bitflyer'
         self.__targets = {
             'BTC_JPY': ProductType.JPY_BTC,
@@ -24,49 +22,83 @@ class BitflyerTicker(Thread):
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
+        self.__stream = None
+
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code)
+
+    def get_site(self):
+        return self.__site
+
+    def get_interval(self):
+        return self.__interval
 
-    def run(self):
+    def get_targets(self):
+        return dict(self.__targets)
 
-        while self.__context.is_active():
+    def set_stream(self, stream):
+        self.__stream = stream
 
-            threads = []
+    def get_polled(self):
+        # REST polling only for the codes which the stream is not delivering. (e.g. socket down)
+        stream = self.__stream
+        return dict((c, p) for c, p in self.__targets.items() if stream is None or not stream.is_live(c))
 
-            for code, product in self.__targets.items():
-                threads.append(Thread(daemon=True, target=self.fetch, args=[code, product]))
+    def get_requests(self):
+        return [
+            (code, self.__endpoint + '/v1/ticker?product_code=' + code, None, None) for code in self.get_polled().keys()
+        ]
 
-            for t in threads:
-                t.start()
+    def process(self, responses):
+        for code, product in self.__targets.items():
+            if code in responses:
+                self.update(code, product, responses[code])
 
-            for t in threads:
-                t.join()
+    def poll(self):
 
-            sleep(self.__interval)
+        threads = []
+
+        for code, product in self.get_polled().items():
+            threads.append(Thread(daemon=True, target=self.fetch, args=[code, product]))
+
+        for t in threads:
+            t.start()
+
+        for t in threads:
+            t.join()
 
     def fetch(self, code, product):
 
         log = self.__context.get_logger(self)
-        ask = None
-        bid = None
-        ltp = None
+        json = None
 
         try:
 
-            json = get(self.__endpoint + '/v1/ticker?product_code=' + code).json()
-
-            ltp = json['ltp'] if 'ltp' in json else None
-            ask = json['best_ask'] if 'best_ask' in json else None
-            bid = json['best_bid'] if 'best_bid' in json else None
-
-            log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+            session = self.__context.get_session(self.__site)
+            json = session.get_json(self.__endpoint + '/v1/ticker?product_code=' + code)
 
         except Exception as e:
 
             log.warn('%s : %s', type(e), e.args)
 
+        self.update(code, product, json)
+
+    def update(self, code, product, json):
+
+        log = self.__context.get_logger(self)
+        json = json if json is not None else {}
+
+        ltp = json['ltp'] if 'ltp' in json else None
+        ask = json['best_ask'] if 'best_ask' in json else None
+        bid = json['best_bid'] if 'best_bid' in json else None
+        ts = parse_timestamp(json['timestamp']) if 'timestamp' in json else None
+
+        log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+
         gauges = self.__context.get_ticker_gauges(self.__site, product)
-        gauges.update_bbo(code, ask, bid)
-        gauges.update_ltp(code, ltp)
+        gauges.update_bbo(code, ask, bid, timestamp=ts)
+        gauges.update_ltp(code, ltp, timestamp=ts)
 
 
 def main():
@@ -74,7 +106,10 @@ def main():
     context.launch_server()
 
     target = BitflyerTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
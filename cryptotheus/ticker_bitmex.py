@@ -1,18 +1,15 @@
 from os import getenv
-from threading import Thread
-from time import sleep
-
-from requests import get
 
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.decode import ListSelector
+from cryptotheus.scheduler import Scheduler
 
 
-class BitmexTicker(Thread):
+class BitmexTicker(object):
     def __init__(self, context,
                  endpoint=getenv('bitmex_endpoint', 'https://www.bitmex.com'),
                  interval=getenv('bitmex_interval', 15)
                  ):
-        super(BitmexTicker, self).__init__()
         self.__site = 'bitmex'
         self.__targets = {
             'XBTUSD': ProductType.USD_BTC,
@@ -28,28 +25,83 @@ class BitmexTicker(Thread):
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
+        self.__wanted = None
+        self.__select = None
+        self.__stream = None
+
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code)
+
+    def get_site(self):
+        return self.__site
+
+    def get_interval(self):
+        return self.__interval
+
+    def get_targets(self):
+        return dict(self.__targets)
+
+    def get_intervals(self):
+        return dict(self.__symbols)
+
+    def set_stream(self, stream):
+        self.__stream = stream
+
+    def is_streamed(self):
+        # The instrument table is maintained by the stream, no polling required.
+        return self.__stream is not None and self.__stream.is_live()
+
+    def get_requests(self):
+
+        if self.is_streamed():
+            return []
+
+        return [
+            ('mappings', self.__endpoint + '/api/v1/instrument/activeIntervals', None, None),
+            ('instruments', self.__endpoint + '/api/v1/instrument/activeAndIndices', None, self.__select),
+        ]
+
+    def process(self, responses):
+
+        if self.is_streamed():
+            return
+
+        mappings = self.mappings(responses['mappings'] if 'mappings' in responses else None)
+
+        instruments = self.instruments(responses['instruments'] if 'instruments' in responses else None)
+
+        self.extract(mappings, instruments)
+
+    def poll(self):
 
-    def run(self):
+        log = self.__context.get_logger(self)
+
+        responses = {}
+
+        for key, url, headers, select in self.get_requests():
 
-        while self.__context.is_active():
-            mappings = self.mappings()
+            try:
 
-            instruments = self.instruments()
+                session = self.__context.get_session(self.__site)
+                responses[key] = session.get_json(url, headers=headers, select=select)
 
-            self.extract(mappings, instruments)
+            except Exception as e:
 
-            sleep(self.__interval)
+                log.warn('%s : %s', type(e), e.args)
 
-    def mappings(self):
+        self.process(responses)
+
+    def mappings(self, json):
 
         log = self.__context.get_logger(self)
 
         mappings = {}
 
-        try:
+        if json is None:
+            return mappings
 
-            json = get(self.__endpoint + '/api/v1/instrument/activeIntervals').json()
+        try:
 
             intervals = json['intervals']
             symbols = json['symbols']
@@ -63,15 +115,16 @@ class BitmexTicker(Thread):
 
         return mappings
 
-    def instruments(self):
+    def instruments(self, json):
 
         log = self.__context.get_logger(self)
 
         instruments = {}
 
-        try:
+        if json is None:
+            return instruments
 
-            json = get(self.__endpoint + '/api/v1/instrument/activeAndIndices').json()
+        try:
 
             for element in json:
                 instruments[element['symbol']] = element
@@ -86,10 +139,15 @@ class BitmexTicker(Thread):
 
         log = self.__context.get_logger(self)
 
+        wanted = set()
+
         for code, product in self.__targets.items():
             symbol = self.__symbols[code]
             symbol = mappings[symbol] if symbol in mappings else None
 
+            if symbol is not None:
+                wanted.add(symbol)
+
             instrument = instruments[symbol] if symbol in instruments else {}
             ask = instrument['askPrice'] if 'askPrice' in instrument else None
             bid = instrument['bidPrice'] if 'bidPrice' in instrument else None
@@ -109,21 +167,48 @@ class BitmexTicker(Thread):
                     break
 
                 if ref not in instruments:
+
+                    if self.__select is not None:
+                        # Referring outside of the selection since, decoded in full again to follow the chain.
+                        log.info('Reference outside of the selection : %s -> %s', instrument['symbol'], ref)
+                        wanted.add(ref)
+
                     break
 
+                wanted.add(ref)
+
                 instrument = instruments[ref]
                 ltp = instrument['markPrice'] if 'markPrice' in instrument else None
 
                 gauges.update_ltp(ref, ltp)
                 log.debug('%s : mrk=%s', ref, ltp)
 
+        self.select(wanted, instruments)
+
+    def select(self, wanted, instruments):
+
+        # Symbols are only known after the mappings, so the ones resolved in this cycle are decoded in the next.
+        if len(wanted) == 0 or len(instruments) == 0:
+            return
+
+        if not wanted.issubset(instruments.keys()):
+            # Rolled over to symbols outside of the selection, decode all again in the next cycle.
+            self.__wanted = None
+            self.__select = None
+        elif wanted != self.__wanted:
+            self.__wanted = wanted
+            self.__select = ListSelector('symbol', wanted)
+
 
 def main():
     context = CryptotheusContext(debug=True)
     context.launch_server()
 
     target = BitmexTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
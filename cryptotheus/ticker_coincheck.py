@@ -1,65 +1,79 @@
 from os import getenv
 from threading import Thread
-from time import sleep
-
-from requests import get
 
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.scheduler import Scheduler
 
 
-class CoincheckTicker(Thread):
+class CoincheckTicker(object):
     def __init__(self, context,
                  endpoint=getenv('coincheck_endpoint', 'https://coincheck.com/api/ticker'),
                  interval=getenv('coincheck_interval', 15)
                  ):
-        super(CoincheckTicker, self).__init__()
         self.__site = 'coincheck'
         self.__targets = {
             'btc_jpy': ProductType.JPY_BTC,
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
+
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code)
+
+    def get_site(self):
+        return self.__site
+
+    def get_interval(self):
+        return self.__interval
 
-    def run(self):
+    def get_requests(self):
+        return [(code, self.__endpoint, None, None) for code in self.__targets.keys()]
 
-        while self.__context.is_active():
+    def process(self, responses):
+        for code, product in self.__targets.items():
+            self.update(code, product, responses[code] if code in responses else None)
 
-            threads = []
+    def poll(self):
 
-            for code, product in self.__targets.items():
-                threads.append(Thread(daemon=True, target=self.fetch, args=[code, product]))
+        threads = []
 
-            for t in threads:
-                t.start()
+        for code, product in self.__targets.items():
+            threads.append(Thread(daemon=True, target=self.fetch, args=[code, product]))
 
-            for t in threads:
-                t.join()
+        for t in threads:
+            t.start()
 
-            sleep(self.__interval)
+        for t in threads:
+            t.join()
 
     def fetch(self, code, product):
 
         log = self.__context.get_logger(self)
-        ask = None
-        bid = None
-        ltp = None
+        json = None
 
         try:
 
             # No code appended. (Only one product available)
-            json = get(self.__endpoint).json()
-
-            ltp = json['last'] if 'last' in json else None
-            ask = json['ask'] if 'ask' in json else None
-            bid = json['bid'] if 'bid' in json else None
-
-            log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+            json = self.__context.get_session(self.__site).get_json(self.__endpoint)
 
         except Exception as e:
 
             log.warn('%s : %s', type(e), e.args)
 
+        self.update(code, product, json)
+
+    def update(self, code, product, json):
+
+        log = self.__context.get_logger(self)
+        json = json if json is not None else {}
+
+        ltp = json['last'] if 'last' in json else None
+        ask = json['ask'] if 'ask' in json else None
+        bid = json['bid'] if 'bid' in json else None
+
+        log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+
         gauges = self.__context.get_ticker_gauges(self.__site, product)
         gauges.update_bbo(code, ask, bid)
         gauges.update_ltp(code, ltp)
@@ -70,7 +84,10 @@ def main():
     context.launch_server()
 
     target = CoincheckTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
@@ -1,14 +1,11 @@
 from os import getenv
-from threading import Thread
-from time import sleep
 from urllib import parse
 
-from requests import request
-
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.scheduler import Scheduler
 
 
-class OandaTicker(Thread):
+class OandaTicker(object):
     @staticmethod
     def get_site():
         return 'oanda'
@@ -26,7 +23,6 @@ class OandaTicker(Thread):
                  interval=getenv('oanda_interval', 15),
                  token=getenv('oanda_token', None)
                  ):
-        super(OandaTicker, self).__init__()
         self.__site = OandaTicker.get_site()
         self.__targets = {
             OandaTicker.get_code(ProductType.JPY_USD): ProductType.JPY_USD,
@@ -34,60 +30,80 @@ class OandaTicker(Thread):
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
         self.__token = token
 
-    def run(self):
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code, ltp=False)
+
+    def get_interval(self):
+        return self.__interval
+
+    def get_requests(self):
+
+        if self.__token is None:
+            return []
+
+        # Single request can contain multiple products.
+        products = parse.quote(','.join(self.__targets.keys()))
+
+        headers = {
+            "Authorization": "Bearer " + self.__token
+        }
+
+        return [(self.__site, self.__endpoint + products, headers, None)]
+
+    def process(self, responses):
 
         log = self.__context.get_logger(self)
 
-        while self.__context.is_active():
+        # {'prices': [{p1}, {p2}, ...]
+        json = responses[self.__site] if self.__site in responses else None
 
-            json = {}
+        json = json if json is not None else {}
 
-            if self.__token is not None:
+        for code, product in self.__targets.items():
 
-                try:
+            ask = None
+            bid = None
 
-                    # Single request can contain multiple products.
-                    products = parse.quote(','.join(self.__targets.keys()))
+            for price in json['prices'] if 'prices' in json else []:
 
-                    headers = {
-                        "Authorization": "Bearer " + self.__token
-                    }
+                if 'status' in price and 'halted' == price['status']:
+                    continue
 
-                    # {'prices': [{p1}, {p2}, ...]
-                    json = request('GET', self.__endpoint + products, headers=headers).json()
+                if 'instrument' not in price:
+                    continue
 
-                except Exception as e:
+                if code != price['instrument']:
+                    continue
 
-                    log.warn('%s : %s', type(e), e.args)
+                ask = price['ask'] if 'ask' in price else None
+                bid = price['bid'] if 'bid' in price else None
+                break
 
-            for code, product in self.__targets.items():
+            gauges = self.__context.get_ticker_gauges(self.__site, product)
+            gauges.update_bbo(code, ask, bid)
+            log.debug('%s : ask=%s bid=%s', code, ask, bid)
 
-                ask = None
-                bid = None
+    def poll(self):
 
-                for price in json['prices'] if 'prices' in json else []:
+        log = self.__context.get_logger(self)
+
+        responses = {}
 
-                    if 'status' in price and 'halted' == price['status']:
-                        continue
+        for key, url, headers, select in self.get_requests():
 
-                    if 'instrument' not in price:
-                        continue
+            try:
 
-                    if code != price['instrument']:
-                        continue
+                session = self.__context.get_session(self.__site)
+                responses[key] = session.get_json(url, headers=headers, select=select)
 
-                    ask = price['ask'] if 'ask' in price else None
-                    bid = price['bid'] if 'bid' in price else None
-                    break
+            except Exception as e:
 
-                gauges = self.__context.get_ticker_gauges(self.__site, product)
-                gauges.update_bbo(code, ask, bid)
-                log.debug('%s : ask=%s bid=%s', code, ask, bid)
+                log.warn('%s : %s', type(e), e.args)
 
-            sleep(self.__interval)
+        self.process(responses)
 
 
 def main():
@@ -95,7 +111,10 @@ def main():
     context.launch_server()
 
     target = OandaTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
@@ -1,18 +1,15 @@
 from os import getenv
-from threading import Thread
-from time import sleep
-
-from requests import get
 
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.decode import MapSelector
+from cryptotheus.scheduler import Scheduler
 
 
-class PoloniexTicker(Thread):
+class PoloniexTicker(object):
     def __init__(self, context,
                  endpoint=getenv('poloniex_endpoint', 'https://poloniex.com/public?command=returnTicker'),
                  interval=getenv('poloniex_interval', 15)
                  ):
-        super(PoloniexTicker, self).__init__()
         self.__site = 'poloniex'
         self.__targets = {
             'USDT_BTC': ProductType.USD_BTC,
@@ -21,39 +18,61 @@ class PoloniexTicker(Thread):
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
+        self.__select = MapSelector(self.__targets.keys())
+
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code)
+
+    def get_site(self):
+        return self.__site
+
+    def get_interval(self):
+        return self.__interval
+
+    def get_requests(self):
+        # Single request contains all products, only the targeted ones are decoded.
+        return [(self.__site, self.__endpoint, None, self.__select)]
 
-    def run(self):
+    def process(self, responses):
 
         log = self.__context.get_logger(self)
 
-        while self.__context.is_active():
+        tickers = responses[self.__site] if self.__site in responses else None
 
-            tickers = {}
+        tickers = tickers if tickers is not None else {}
 
-            try:
+        for code, product in self.__targets.items():
+            json = tickers[code] if code in tickers else {}
 
-                # Single request contains all products
-                tickers = get(self.__endpoint).json()
+            ltp = json['last'] if 'last' in json else None
+            ask = json['lowestAsk'] if 'lowestAsk' in json else None
+            bid = json['highestBid'] if 'highestBid' in json else None
 
-            except Exception as e:
+            gauges = self.__context.get_ticker_gauges(self.__site, product)
+            gauges.update_bbo(code, ask, bid)
+            gauges.update_ltp(code, ltp)
 
-                log.warn('%s : %s', type(e), e.args)
+            log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
 
-            for code, product in self.__targets.items():
-                json = tickers[code] if code in tickers else {}
+    def poll(self):
 
-                ltp = json['last'] if 'last' in json else None
-                ask = json['lowestAsk'] if 'lowestAsk' in json else None
-                bid = json['highestBid'] if 'highestBid' in json else None
+        log = self.__context.get_logger(self)
 
-                gauges = self.__context.get_ticker_gauges(self.__site, product)
-                gauges.update_bbo(code, ask, bid)
-                gauges.update_ltp(code, ltp)
+        responses = {}
 
-                log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+        for key, url, headers, select in self.get_requests():
 
-            sleep(self.__interval)
+            try:
+
+                session = self.__context.get_session(self.__site)
+                responses[key] = session.get_json(url, headers=headers, select=select)
+
+            except Exception as e:
+
+                log.warn('%s : %s', type(e), e.args)
+
+        self.process(responses)
 
 
 def main():
@@ -61,7 +80,10 @@ def main():
     context.launch_server()
 
     target = PoloniexTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
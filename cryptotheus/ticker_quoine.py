@@ -1,18 +1,15 @@
 from os import getenv
-from threading import Thread
-from time import sleep
-
-from requests import get
 
 from cryptotheus.context import ProductType, CryptotheusContext
+from cryptotheus.decode import ListSelector
+from cryptotheus.scheduler import Scheduler
 
 
-class QuoineTicker(Thread):
+class QuoineTicker(object):
     def __init__(self, context,
                  endpoint=getenv('quoine_endpoint', 'https://api.quoine.com/products'),
                  interval=getenv('quoine_interval', 15)
                  ):
-        super(QuoineTicker, self).__init__()
         self.__site = 'quoine'
         self.__targets = {
             'BTCJPY': ProductType.JPY_BTC,
@@ -21,44 +18,65 @@ class QuoineTicker(Thread):
         }
         self.__context = context
         self.__endpoint = endpoint
-        self.__interval = interval
+        self.__interval = float(interval)
+        self.__select = ListSelector('currency_pair_code', self.__targets.keys())
+
+        for code, product in self.__targets.items():
+            context.get_ticker_gauges(self.__site, product).register(code)
+
+    def get_site(self):
+        return self.__site
+
+    def get_interval(self):
+        return self.__interval
+
+    def get_requests(self):
+        return [(self.__site, self.__endpoint, None, self.__select)]
 
-    def run(self):
+    def process(self, responses):
 
         log = self.__context.get_logger(self)
 
-        while self.__context.is_active():
+        products = responses[self.__site] if self.__site in responses else None
 
-            products = []
+        indexed = {}
 
-            try:
+        for json in products if products is not None else []:
 
-                products = get(self.__endpoint).json()
+            if 'currency_pair_code' in json:
+                indexed[json['currency_pair_code']] = json
 
-            except BaseException as e:
+        for code, product in self.__targets.items():
 
-                log.warn('%s : %s', type(e), e.args)
+            json = indexed[code] if code in indexed else {}
+
+            ask = json['market_ask'] if 'market_ask' in json else None
+            bid = json['market_bid'] if 'market_bid' in json else None
+            ltp = json['last_traded_price'] if 'last_traded_price' in json else None
 
-            for code, product in self.__targets.items():
+            gauges = self.__context.get_ticker_gauges(self.__site, product)
+            gauges.update_bbo(code, ask, bid)
+            gauges.update_ltp(code, ltp)
+            log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
 
-                ask = None
-                bid = None
-                ltp = None
+    def poll(self):
 
-                for json in products if products is not None else []:
+        log = self.__context.get_logger(self)
 
-                    if 'currency_pair_code' in json and code == json['currency_pair_code']:
-                        ask = json['market_ask'] if 'market_ask' in json else None
-                        bid = json['market_bid'] if 'market_bid' in json else None
-                        ltp = json['last_traded_price'] if 'last_traded_price' in json else None
-                        break
+        responses = {}
 
-                gauges = self.__context.get_ticker_gauges(self.__site, product)
-                gauges.update_bbo(code, ask, bid)
-                gauges.update_ltp(code, ltp)
-                log.debug('%s : ask=%s bid=%s ltp=%s', code, ask, bid, ltp)
+        for key, url, headers, select in self.get_requests():
 
-            sleep(self.__interval)
+            try:
+
+                session = self.__context.get_session(self.__site)
+                responses[key] = session.get_json(url, headers=headers, select=select)
+
+            except BaseException as e:
+
+                log.warn('%s : %s', type(e), e.args)
+
+        self.process(responses)
 
 
 def main():
@@ -66,7 +84,10 @@ def main():
     context.launch_server()
 
     target = QuoineTicker(context)
-    target.start()
+
+    scheduler = Scheduler(context)
+    scheduler.add(target)
+    scheduler.start()
 
 
 if __name__ == '__main__':
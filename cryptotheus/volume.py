@@ -0,0 +1,116 @@
+from calendar import timegm
+from threading import Lock
+from time import time
+
+
+def parse_timestamp(text):
+    # '2017-01-01T12:34:56.789Z' -> epoch seconds (UTC), avoiding strptime on the hot path.
+    return timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                   int(text[11:13]), int(text[14:16]), int(text[17:19])))
+
+
+class VolumeWindow(object):
+    def __init__(self, delta, buckets):
+        self.__size = int(buckets)
+        self.__width = delta.total_seconds() / self.__size
+        self.__buckets = [0.0] * self.__size
+        self.__head = None
+        self.__total = 0.0
+
+    def __advance(self, epoch):
+
+        if self.__head is None:
+            self.__head = epoch
+            return
+
+        steps = epoch - self.__head
+
+        if steps <= 0:
+            return
+
+        if steps >= self.__size:
+            self.__buckets = [0.0] * self.__size
+            self.__total = 0.0
+        else:
+            for i in range(self.__head + 1, epoch + 1):
+                index = i % self.__size
+                self.__total -= self.__buckets[index]
+                self.__buckets[index] = 0.0
+
+        self.__head = epoch
+
+    def add(self, timestamp, value):
+
+        epoch = int(timestamp // self.__width)
+
+        self.__advance(epoch)
+
+        if epoch <= self.__head - self.__size:
+            return
+
+        self.__buckets[epoch % self.__size] += value
+        self.__total += value
+
+    def get_value(self, timestamp):
+
+        self.__advance(int(timestamp // self.__width))
+
+        # Guard against floating point residue after expiring buckets.
+        return self.__total if self.__total > 1e-9 else 0.0
+
+
+class VolumeAggregator(object):
+    def __init__(self, intervals, buckets=720, journal=None, site=None, product=None):
+        self.__lock = Lock()
+        self.__windows = {}
+        self.__horizon = 0.0
+        self.__cursor = None
+        self.__journal = journal
+        self.__site = site
+        self.__product = product
+
+        for interval, delta in intervals.items():
+            self.__windows[interval] = VolumeWindow(delta, buckets)
+            self.__horizon = max(self.__horizon, delta.total_seconds())
+
+        if journal is not None:
+
+            # Rebuild the windows from the journal, only the gap since the cursor is fetched.
+            cursor, executions = journal.load(site, product, time() - self.__horizon)
+
+            for timestamp, value in executions:
+                for window in self.__windows.values():
+                    window.add(timestamp, value)
+
+            self.__cursor = cursor
+
+    def get_horizon(self):
+        return self.__horizon
+
+    def get_cursor(self):
+        return self.__cursor
+
+    def update(self, cursor, executions):
+
+        with self.__lock:
+
+            if self.__journal is not None:
+                since = time() - self.__horizon
+                self.__journal.append(self.__site, self.__product, cursor, executions, since)
+
+            for exec_id, timestamp, value in executions:
+                for window in self.__windows.values():
+                    window.add(timestamp, value)
+
+            self.__cursor = cursor
+
+    def get_values(self, timestamp):
+
+        with self.__lock:
+
+            values = {}
+
+            for interval, window in self.__windows.items():
+                values[interval] = window.get_value(timestamp)
+
+            return values
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from glob import glob
+from math import isnan
+from random import Random
+from threading import Thread
+from time import perf_counter, sleep, time
+from urllib.request import urlopen
+
+from cryptotheus.context import CryptotheusContext, ProductType
+from cryptotheus.recorder import TickReader
+
+
+def percentile(values, ratio):
+    return values[min(int(len(values) * ratio), len(values) - 1)] if len(values) > 0 else float('nan')
+
+
+def recorded(patterns):
+    # (timestamp, site, product, code, ask, bid, mid, ltp) of all the files, in the recorded order.
+    rows = []
+
+    for filename in sorted(f for pattern in patterns for f in glob(pattern)):
+
+        reader = TickReader(filename)
+
+        sites = reader.get_sites()
+        products = reader.get_products()
+        codes = reader.get_codes()
+        columns = reader.get_columns()
+
+        rows.extend(zip(columns['timestamp'].tolist(),
+                        [sites[i] for i in columns['site'].tolist()],
+                        [products[i] for i in columns['product'].tolist()],
+                        [codes[i] for i in columns['code'].tolist()],
+                        columns['ask'].tolist(), columns['bid'].tolist(),
+                        columns['mid'].tolist(), columns['ltp'].tolist()))
+
+        # Views of the mapping are released before closing.
+        del columns
+
+        reader.close()
+
+    rows.sort(key=lambda row: row[0])
+
+    return rows
+
+
+def synthetic(series, rate, seed, shard=0, shards=1):
+    # Random walks of the codes of the shard, updated round-robin at the given rate in recorded time.
+    random = Random(seed + shard)
+    products = list(ProductType)
+    codes = [code for code in range(series) if code % shards == shard]
+    prices = dict((code, 1000.0 * (1 + code % 7)) for code in codes)
+    timestamp = time()
+    index = 0
+
+    while len(codes) > 0:
+
+        code = codes[index % len(codes)]
+        prices[code] = prices[code] * (1 + random.gauss(0, 0.0005))
+        spread = prices[code] * 0.0002 * (1 + random.random())
+
+        yield (timestamp, 'site%03d' % (code % 10), products[code % len(products)].name, 'code%05d' % code,
+               prices[code] + spread, prices[code] - spread, prices[code], prices[code] + random.gauss(0, spread))
+
+        timestamp = timestamp + shards / float(rate)
+        index = index + 1
+
+
+def price(value):
+    return None if isnan(value) else value
+
+
+class Feeder(Thread):
+    def __init__(self, context, rows, speed, duration):
+        super(Feeder, self).__init__(daemon=True)
+        self.__context = context
+        self.__rows = rows
+        self.__speed = float(speed)
+        self.__duration = float(duration)
+        self.__gauges = {}
+        self.updates = 0
+
+    def __get_gauges(self, site, product):
+
+        key = (site, product)
+
+        gauges = self.__gauges[key] if key in self.__gauges else None
+
+        if gauges is None:
+            gauges = self.__context.get_ticker_gauges(site, ProductType[product])
+            self.__gauges[key] = gauges
+
+        return gauges
+
+    def run(self):
+
+        start = perf_counter()
+        origin = None
+
+        for timestamp, site, product, code, ask, bid, mid, ltp in self.__rows:
+
+            now = perf_counter()
+
+            if now - start > self.__duration:
+                break
+
+            origin = timestamp if origin is None else origin
+
+            if self.__speed > 0:
+
+                # Paced on the recorded timestamps, scaled by the speed.
+                wait = start + (timestamp - origin) / self.__speed - now
+
+                if wait > 0:
+                    sleep(wait)
+
+            gauges = self.__get_gauges(site, product)
+            gauges.update_bbo(code, price(ask), price(bid), mid=price(mid))
+            gauges.update_ltp(code, price(ltp))
+
+            self.updates = self.updates + 2
+
+
+class Scraper(Thread):
+    def __init__(self, url, interval):
+        super(Scraper, self).__init__(daemon=True)
+        self.__url = url
+        self.__interval = float(interval)
+        self.latencies = []
+        self.size = 0
+
+    def run(self):
+
+        while True:
+
+            start = perf_counter()
+
+            try:
+                self.size = len(urlopen(self.__url).read())
+                self.latencies.append(perf_counter() - start)
+            except Exception:
+                pass
+
+            sleep(max(self.__interval - (perf_counter() - start), 0.0))
+
+
+def main():
+    p = ArgumentParser(description='Replay recorded or synthetic ticks through the context, without the network.')
+    p.add_argument('files', nargs='*', help='Tick files (or glob patterns) to replay, synthetic ticks if none.')
+    p.add_argument('--speed', type=float, default=0.0, help='Multiple of the real time, 0 for as fast as possible.')
+    p.add_argument('--duration', type=float, default=30.0, help='Maximum seconds to replay.')
+    p.add_argument('--threads', type=int, default=1, help='Feeding threads, the codes are partitioned across.')
+    p.add_argument('--series', type=int, default=100, help='Synthetic codes.')
+    p.add_argument('--rate', type=float, default=1000.0, help='Synthetic updates per second, in recorded time.')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--collector', default='gauge', choices=['gauge', 'snapshot'])
+    p.add_argument('--port', type=int, default=18002)
+    p.add_argument('--scrape', type=float, default=1.0, help='Scrape interval in seconds.')
+    p.add_argument('--report', type=float, default=5.0, help='Report interval in seconds.')
+    args = p.parse_args()
+
+    if len(args.files) > 0:
+
+        rows = recorded(args.files)
+
+        # Codes stay on a single thread, so that their updates are replayed in order.
+        sources = [[row for row in rows if hash((row[1], row[3])) % args.threads == shard]
+                   for shard in range(args.threads)]
+
+        capacity = len(set((row[1], row[3]) for row in rows))
+
+    else:
+
+        sources = [synthetic(args.series, args.rate, args.seed, shard, args.threads) for shard in range(args.threads)]
+
+        capacity = args.series
+
+    # One board record per replayed code.
+    context = CryptotheusContext(host='localhost', port=args.port, collector=args.collector, ticks=None,
+                                 board_capacity=max(capacity, 1))
+    context.launch_server()
+
+    feeders = [Feeder(context, source, args.speed, args.duration) for source in sources]
+
+    scraper = Scraper('http://localhost:%s/metrics' % args.port, args.scrape)
+    scraper.start()
+
+    start = perf_counter()
+
+    for feeder in feeders:
+        feeder.start()
+
+    last = (start, 0)
+
+    while any(feeder.is_alive() for feeder in feeders):
+
+        for feeder in feeders:
+            feeder.join(timeout=args.report / len(feeders))
+
+        now = perf_counter()
+        updates = sum(feeder.updates for feeder in feeders)
+        latencies = sorted(scraper.latencies)
+
+        print('elapsed=%-8.1f updates/s=%-10.0f scrape p50=%-8.1f p99=%-8.1f (ms) bytes=%s' % (
+            now - start, (updates - last[1]) / max(now - last[0], 1e-9),
+            percentile(latencies, 0.50) * 1e3, percentile(latencies, 0.99) * 1e3, scraper.size))
+
+        last = (now, updates)
+
+    elapsed = perf_counter() - start
+    updates = sum(feeder.updates for feeder in feeders)
+    latencies = sorted(scraper.latencies)
+
+    print('total    updates=%-10d updates/s=%-10.0f scrapes=%-6d p50=%-8.1f p99=%-8.1f max=%-8.1f (ms)' % (
+        updates, updates / elapsed, len(latencies), percentile(latencies, 0.50) * 1e3,
+        percentile(latencies, 0.99) * 1e3, latencies[-1] * 1e3 if len(latencies) > 0 else float('nan')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+from math import isnan
+from mmap import mmap
+from os import path
+from struct import pack_into
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from cryptotheus.board import ASK, BID, LTP, PriceBoard
+
+
+class PriceBoardTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = path.join(self.directory.name, 'test.board')
+        self.board = PriceBoard(path=self.path, capacity=2)
+
+    def tearDown(self):
+        self.board.close()
+        self.directory.cleanup()
+
+    def __corrupt(self, offset, sequence):
+        # Sequence left as by a writer killed mid-write, from outside of the board.
+        with open(self.path, 'r+b') as f, mmap(f.fileno(), 0) as m:
+            pack_into('<Q', m, offset, sequence)
+
+    def test_write_and_read(self):
+        offset = self.board.allocate('bitflyer', 'BTC_JPY', 'JPY_BTC')
+
+        self.assertTrue(all(isnan(v) for v in self.board.read(offset)))
+
+        self.board.write(offset, [(ASK, 2.0), (BID, 1.0), (LTP, 1.5)])
+
+        ask, bid, mid, ltp, timestamp, updated = self.board.read(offset)
+
+        self.assertEqual((ask, bid, ltp), (2.0, 1.0, 1.5))
+        self.assertEqual(self.board.find('bitflyer', 'BTC_JPY'), offset)
+        self.assertEqual(self.board.allocate('bitflyer', 'BTC_JPY', 'JPY_BTC'), offset)
+
+    def test_shared_file(self):
+        offset = self.board.allocate('bitflyer', 'BTC_JPY', 'JPY_BTC')
+        self.board.write(offset, [(ASK, 2.0)])
+
+        # Another process mapping the same file, with the records indexed from the shared header.
+        other = PriceBoard(path=self.path, capacity=16)
+
+        try:
+            self.assertEqual(other.get_capacity(), 2)
+            self.assertEqual(other.find('bitflyer', 'BTC_JPY'), offset)
+            self.assertEqual(other.read(offset)[0], 2.0)
+            self.assertEqual(other.get_records(), [(offset, 'bitflyer', 'BTC_JPY', 'JPY_BTC')])
+
+            other.write(other.allocate('zaif', 'btc_jpy', 'JPY_BTC'), [(BID, 1.0)])
+
+            self.assertEqual(self.board.read(self.board.find('zaif', 'btc_jpy'))[1], 1.0)
+            self.assertEqual(len(self.board.get_records(1)), 1)
+        finally:
+            other.close()
+
+    def test_torn_record(self):
+        offset = self.board.allocate('bitflyer', 'BTC_JPY', 'JPY_BTC')
+        self.board.write(offset, [(ASK, 2.0)])
+
+        self.__corrupt(offset, 3)
+
+        # Never completed, read as empty instead of spinning.
+        self.assertTrue(all(isnan(v) for v in self.board.read(offset, retries=10)))
+
+        # Taken over by the next writer.
+        self.board.write(offset, [(ASK, 3.0)])
+
+        self.assertEqual(self.board.read(offset)[0], 3.0)
+
+    def test_full_board(self):
+        self.assertIsNotNone(self.board.allocate('bitflyer', 'BTC_JPY'))
+        self.assertIsNotNone(self.board.allocate('bitflyer', 'FX_BTC_JPY'))
+        self.assertIsNone(self.board.allocate('zaif', 'btc_jpy'))
+
+        # Not on the board, written nowhere and read as empty.
+        self.board.write(None, [(ASK, 1.0)])
+
+        self.assertTrue(all(isnan(v) for v in self.board.read(None)))
+        self.assertIsNone(self.board.find('zaif', 'btc_jpy'))
+
+    def test_invalid_keys(self):
+        self.assertRaises(ValueError, self.board.allocate, 'bitflyer', 'X' * 64)
+        self.assertRaises(ValueError, self.board.allocate, 'bitflyer', 'BTC_JPY', 'PRODUCT_TOO_LONG')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+from math import nan
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from cryptotheus.board import MID, PriceBoard
+from cryptotheus.context import BoardFollower, CryptotheusContext, ProductType, UnitType
+from cryptotheus.conversion import ConversionGraph
+
+_SOURCES = 'bitflyer:BTC_JPY,quoine:BTCJPY,bitfinex:btcusd,oanda:USD_JPY,bitflyer:ETH_BTC'
+
+
+def _quote(mid, ltp=nan):
+    return nan, nan, mid, ltp, nan, nan
+
+
+class ConversionGraphTest(TestCase):
+
+    def setUp(self):
+        self.graph = ConversionGraph(list(UnitType), list(ProductType), sources=_SOURCES)
+
+    def test_direct_and_inverse(self):
+        self.graph.on_quote('bitflyer', ProductType.JPY_BTC, 'BTC_JPY', _quote(1000000.0))
+
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 1000000.0)
+        self.assertEqual(self.graph.get_rate(UnitType.JPY, UnitType.BTC), 0.000001)
+        self.assertEqual(self.graph.convert(2.0, UnitType.BTC, UnitType.JPY), 2000000.0)
+        self.assertIsNone(self.graph.get_rate(UnitType.USD, UnitType.JPY))
+        self.assertIsNone(self.graph.convert(None, UnitType.BTC, UnitType.JPY))
+
+    def test_invalidated_on_quote(self):
+        self.graph.on_quote('bitflyer', ProductType.BTC_ETH, 'ETH_BTC', _quote(0.05))
+        self.graph.on_quote('bitflyer', ProductType.JPY_BTC, 'BTC_JPY', _quote(1000000.0))
+
+        self.assertEqual(self.graph.get_rate(UnitType.ETH, UnitType.JPY), 50000.0)
+
+        # Cached rates depending on the quoted product only. (the last price, without a mid)
+        self.graph.on_quote('bitflyer', ProductType.JPY_BTC, 'BTC_JPY', _quote(nan, ltp=2000000.0))
+
+        self.assertEqual(self.graph.get_rate(UnitType.ETH, UnitType.JPY), 100000.0)
+        self.assertEqual(self.graph.get_rate(UnitType.ETH, UnitType.BTC), 0.05)
+
+    def test_preference(self):
+        self.graph.on_quote('quoine', ProductType.JPY_BTC, 'BTCJPY', _quote(1010000.0))
+
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 1010000.0)
+
+        self.graph.on_quote('bitflyer', ProductType.JPY_BTC, 'BTC_JPY', _quote(1000000.0))
+
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 1000000.0)
+
+        # Not quoted any more, falls back to the next source.
+        self.graph.on_quote('bitflyer', ProductType.JPY_BTC, 'BTC_JPY', _quote(nan))
+
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 1010000.0)
+
+        # Not a source, ignored.
+        self.graph.on_quote('zaif', ProductType.JPY_BTC, 'btc_jpy', _quote(1.0))
+
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 1010000.0)
+
+    def test_topology(self):
+        self.graph.on_quote('bitfinex', ProductType.USD_BTC, 'btcusd', _quote(9000.0))
+        self.graph.on_quote('oanda', ProductType.JPY_USD, 'USD_JPY', _quote(110.0))
+
+        # Via USD while no BTC/JPY is quoted.
+        self.assertEqual(len(self.graph.get_path(UnitType.BTC, UnitType.JPY)), 2)
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 990000.0)
+
+        self.graph.on_quote('bitflyer', ProductType.JPY_BTC, 'BTC_JPY', _quote(1000000.0))
+
+        self.assertEqual(self.graph.get_path(UnitType.BTC, UnitType.JPY), [(ProductType.JPY_BTC, True)])
+        self.assertEqual(self.graph.get_rate(UnitType.BTC, UnitType.JPY), 1000000.0)
+
+
+class BoardFollowerTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = path.join(self.directory.name, 'test.board')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_other_process(self):
+        # Quoted by another shard, on the board shared with this one.
+        writer = PriceBoard(path=self.path, capacity=16)
+        reader = PriceBoard(path=self.path, capacity=16)
+
+        graph = ConversionGraph(list(UnitType), list(ProductType), sources=_SOURCES)
+        follower = BoardFollower(CryptotheusContext(), reader, [graph])
+
+        try:
+            offset = writer.allocate('bitflyer', 'BTC_JPY', ProductType.JPY_BTC.name)
+            writer.write(offset, [(MID, 1000000.0)])
+
+            follower.poll()
+
+            self.assertEqual(graph.get_rate(UnitType.BTC, UnitType.JPY), 1000000.0)
+
+            writer.write(offset, [(MID, 1100000.0)])
+
+            follower.poll()
+
+            self.assertEqual(graph.get_rate(UnitType.BTC, UnitType.JPY), 1100000.0)
+        finally:
+            writer.close()
+            reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+from json import dumps, loads
+from unittest import TestCase, main
+
+from cryptotheus.decode import ListSelector, MapSelector
+
+
+class MapSelectorTest(TestCase):
+
+    def setUp(self):
+        self.select = MapSelector(['USDT_BTC', 'BTC_ETH'])
+
+    def test_top_level_keys(self):
+        content = dumps({'PAD': {'last': '1.0'}, 'USDT_BTC': {'last': '9000.0'}, 'BTC_ETH': {'last': '0.05'}})
+
+        self.assertEqual(self.select(content), {'USDT_BTC': {'last': '9000.0'}, 'BTC_ETH': {'last': '0.05'}})
+        self.assertEqual(self.select(content.encode()), self.select(content))
+
+    def test_nested_key(self):
+        # Same key within the value of another key, before the top-level one.
+        content = '{"PAD": {"USDT_BTC": 1}, "USDT_BTC": {"last": "9000.0"}}'
+
+        self.assertEqual(self.select(content), {'USDT_BTC': {'last': '9000.0'}})
+
+    def test_key_within_string(self):
+        # After an escaped quote, and with the brackets within the strings before it.
+        content = '{"a\\"USDT_BTC": 1, "b": "{[", "USDT_BTC": 2, "c": "\\\\", "BTC_ETH": 3}'
+
+        self.assertEqual(self.select(content), {'USDT_BTC': 2, 'BTC_ETH': 3})
+
+    def test_missing_key(self):
+        self.assertEqual(self.select('{"PAD": {"BTC_ETH": 1}}'), {})
+
+    def test_not_object(self):
+        self.assertEqual(self.select('[1, 2]'), [1, 2])
+
+
+class ListSelectorTest(TestCase):
+
+    def setUp(self):
+        self.select = ListSelector('currency_pair_code', ['BTCJPY', 'ETHBTC'])
+
+    def test_matched_elements(self):
+        content = dumps([{'currency_pair_code': 'PAD%02d' % i, 'name': '[%s]' % i} for i in range(10)] + [
+            {'currency_pair_code': 'BTCJPY', 'market_ask': 990000.0},
+            {'currency_pair_code': 'ETHBTC', 'market_ask': 0.05, 'tags': [{'x': 1}]},
+        ])
+
+        expected = [e for e in loads(content) if e['currency_pair_code'] in ('BTCJPY', 'ETHBTC')]
+
+        self.assertEqual(self.select(content), expected)
+
+    def test_nested_field(self):
+        # Nested object carrying the field, not an element of the array.
+        self.assertEqual(self.select('[{"x": {"currency_pair_code": "ETHBTC"}}]'), [])
+
+        content = '[{"x": {"currency_pair_code": "ETHBTC"}, "currency_pair_code": "BTCJPY"}]'
+
+        self.assertEqual(self.select(content), loads(content))
+
+    def test_field_within_string(self):
+        content = '[{"a\\"currency_pair_code": "ETHBTC", "currency_pair_code": "PAD"}, ' \
+                  '{"currency_pair_code": "BTCJPY"}]'
+
+        self.assertEqual(self.select(content), [{'currency_pair_code': 'BTCJPY'}])
+
+    def test_field_not_string(self):
+        content = '[{"currency_pair_code": {"a": 1}}, {"x": {"currency_pair_code": "BTCJPY"}}]'
+
+        self.assertEqual(self.select(content), [])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+from asyncio import run
+from threading import Thread
+from time import monotonic, sleep
+from unittest import TestCase, main
+
+from cryptotheus.limiter import Priority, RateLimitExceeded, TokenBucket
+from cryptotheus.session import SiteSession
+
+
+class TokenBucketTest(TestCase):
+
+    def test_burst_and_rate(self):
+        bucket = TokenBucket('test', 'public', 10, 2)
+
+        start = monotonic()
+
+        for _ in range(3):
+            bucket.acquire(timeout=1.0)
+
+        # Burst served immediately, the third one after a refill.
+        self.assertGreaterEqual(monotonic() - start, 0.08)
+
+    def test_deadline(self):
+        bucket = TokenBucket('test', 'public', 1, 1)
+
+        bucket.acquire(timeout=1.0)
+
+        start = monotonic()
+
+        self.assertRaises(RateLimitExceeded, bucket.acquire, timeout=0.05)
+        self.assertLess(monotonic() - start, 0.5)
+
+    def test_priority(self):
+        bucket = TokenBucket('test', 'private', 5, 1)
+        bucket.acquire()
+
+        served = []
+
+        def acquire(priority):
+            bucket.acquire(priority=priority, timeout=5.0)
+            served.append(priority)
+
+        # Queued first, but served after the account waiting for the same token.
+        ticker = Thread(target=acquire, args=(Priority.TICKER,))
+        ticker.start()
+
+        sleep(0.02)
+
+        account = Thread(target=acquire, args=(Priority.ACCOUNT,))
+        account.start()
+
+        ticker.join()
+        account.join()
+
+        self.assertEqual(served, [Priority.ACCOUNT, Priority.TICKER])
+
+    def test_throttled(self):
+        bucket = TokenBucket('test', 'public', 10, 10)
+
+        # HTTP 429, the remaining tokens are drained until the Retry-After.
+        session = SiteSession('test', public=bucket)
+        session.record_limits({'Retry-After': '0.3'}, status=429)
+
+        self.assertRaises(RateLimitExceeded, bucket.acquire, timeout=0.1)
+
+        start = monotonic()
+
+        bucket.acquire(timeout=1.0)
+
+        self.assertGreaterEqual(monotonic() - start, 0.1)
+
+    def test_async(self):
+        bucket = TokenBucket('test', 'public', 10, 1)
+
+        async def acquire(timeout):
+            start = monotonic()
+            await bucket.acquire_async(timeout=timeout)
+            return monotonic() - start
+
+        self.assertLess(run(acquire(1.0)), 0.05)
+
+        # Reserved upfront, then waited on the event loop until refilled.
+        self.assertGreaterEqual(run(acquire(1.0)), 0.08)
+
+        self.assertRaises(RateLimitExceeded, run, acquire(0.01))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+from argparse import Namespace
+from multiprocessing import get_context
+from socket import socket
+from threading import Thread
+from time import sleep, time
+from unittest import TestCase, main, skipUnless
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from benchmark import standin, standin_ws
+from cryptotheus.context import CryptotheusContext
+from cryptotheus.stream_bitflyer import BitflyerStream
+from cryptotheus.ticker_bitflyer import BitflyerTicker
+
+
+def _free_port():
+    with socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@skipUnless(aiohttp is not None, 'requires aiohttp')
+class BitflyerStreamTest(TestCase):
+    # Against the local stand-ins, with each WebSocket connection dropped after a second.
+
+    def setUp(self):
+        rest = _free_port()
+        self.ws = _free_port()
+
+        self.server = standin.StandinServer(('127.0.0.1', rest))
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        args = Namespace(ws_host='127.0.0.1', ws_port=self.ws, ws_interval=0.05, ws_drop_after=1.0)
+        self.streamer = get_context('spawn').Process(target=standin_ws.serve, args=(args,), daemon=True)
+        self.streamer.start()
+
+        self.context = CryptotheusContext()
+        self.ticker = BitflyerTicker(self.context, endpoint='http://127.0.0.1:%s' % rest)
+
+    def tearDown(self):
+        self.streamer.terminate()
+        self.streamer.join()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __wait(self, condition, timeout=10.0):
+        deadline = time() + timeout
+        while time() < deadline:
+            if condition():
+                return True
+            sleep(0.02)
+        return False
+
+    def test_reconnect_and_fallback(self):
+        endpoint = 'ws://127.0.0.1:%s/json-rpc' % self.ws
+
+        stream = BitflyerStream(self.context, self.ticker.get_targets(), endpoint=endpoint)
+        stream.daemon = True
+
+        self.ticker.set_stream(stream)
+
+        # Everything is polled over REST, until the stream delivers.
+        self.assertEqual(len(self.ticker.get_requests()), len(self.ticker.get_targets()))
+
+        stream.start()
+
+        self.assertTrue(self.__wait(lambda: len(self.ticker.get_requests()) == 0), 'stream not live')
+
+        # Dropped by the stand-in, the codes fall back to REST while disconnected.
+        self.assertTrue(self.__wait(lambda: not stream.is_connected()), 'connection not dropped')
+        self.assertEqual(len(self.ticker.get_requests()), len(self.ticker.get_targets()))
+
+        gauges = self.context.get_ticker_gauges('bitflyer', self.ticker.get_targets()['BTC_JPY'])
+        board = self.context.get_board()
+        record = board.find('bitflyer', 'BTC_JPY')
+        updated = board.read(record)[5]
+
+        self.ticker.poll()
+
+        self.assertGreater(board.read(record)[5], updated)
+        self.assertIsNotNone(gauges.get_cached_ltp('BTC_JPY'))
+
+        # Reconnected and resubscribed, the REST polling stops again.
+        self.assertTrue(self.__wait(lambda: stream.is_connected() and len(self.ticker.get_requests()) == 0),
+                        'stream not live again')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+from os import path
+from tempfile import TemporaryDirectory
+from time import time
+from unittest import TestCase, main
+from urllib.parse import unquote
+
+from prometheus_client import REGISTRY
+
+from cryptotheus.account_bitmex import BitmexAccount
+from cryptotheus.context import CryptotheusContext
+from cryptotheus.journal import ExecutionJournal
+from cryptotheus.volume import VolumeAggregator, VolumeWindow, parse_timestamp
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class VolumeWindowTest(TestCase):
+
+    def test_buckets(self):
+        # 10 seconds per bucket.
+        window = VolumeWindow(timedelta(seconds=60), 6)
+
+        window.add(1000, 1.0)
+        window.add(1025, 2.0)
+
+        self.assertEqual(window.get_value(1030), 3.0)
+        self.assertEqual(window.get_value(1065), 2.0)
+
+        # Older than the window, dropped.
+        window.add(1000, 4.0)
+
+        self.assertEqual(window.get_value(1065), 2.0)
+        self.assertEqual(window.get_value(1085), 0.0)
+
+        # Skipped over more than the whole window.
+        window.add(2000, 5.0)
+
+        self.assertEqual(window.get_value(2000), 5.0)
+
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp('1970-01-02T00:00:01.500Z'), 86401)
+
+
+class VolumeAggregatorTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.journal = ExecutionJournal(path.join(self.directory.name, 'journal.db'))
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_rebuilt_from_journal(self):
+        intervals = {'01H': timedelta(hours=1), '01D': timedelta(days=1)}
+
+        aggregator = VolumeAggregator(intervals, buckets=60, journal=self.journal, site='test', product='BTC')
+
+        now = time()
+
+        aggregator.update('c1', [('a', now - 7200, 1.0), ('b', now - 60, 2.0)])
+
+        # Appended again, e.g. fetched once more after a restart.
+        aggregator.update('c2', [('b', now - 60, 2.0)])
+
+        restarted = VolumeAggregator(intervals, buckets=60, journal=self.journal, site='test', product='BTC')
+
+        self.assertEqual(restarted.get_cursor(), 'c2')
+        self.assertEqual(restarted.get_values(now), {'01H': 2.0, '01D': 3.0})
+
+
+class _Bitmex(BitmexAccount):
+    # Signed requests answered locally, honoring startTime and endTime inclusively as the exchange does.
+    symbols = ['XBTUSD', 'XBTZ17', 'XBJZ17']
+    executions = {}
+
+    def _json_get(self, path, method='GET', body=''):
+
+        if path.startswith('/api/v1/instrument/activeIntervals'):
+            return {'intervals': ['XBT:perpetual', 'XBT:quarterly', 'XBJ:quarterly'], 'symbols': self.symbols}
+
+        if not path.startswith('/api/v1/execution/tradeHistory'):
+            return []
+
+        query = dict(unquote(p).split('=', 1) for p in path.split('?', 1)[1].split('&'))
+        rows = self.executions[query['symbol']] if query['symbol'] in self.executions else []
+        rows = [r for r in rows if 'startTime' not in query or r['transactTime'] >= query['startTime']]
+        rows = [r for r in rows if 'endTime' not in query or r['transactTime'] <= query['endTime']]
+
+        return sorted(rows, key=lambda r: r['transactTime'], reverse=True)
+
+
+class BitmexExecutionTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.context = CryptotheusContext(journal=path.join(self.directory.name, 'journal.db'))
+
+    def tearDown(self):
+        self.context.get_journal().close()
+        self.directory.cleanup()
+
+    @staticmethod
+    def __volume(alias):
+        labels = {'site': 'bitmex', 'type': '01H', 'name': alias}
+        return REGISTRY.get_sample_value('account_volume_btc', labels)
+
+    def test_executions_without_id(self):
+        now = _iso(time() - 10)
+        past = _iso(time() - 20)
+
+        _Bitmex.executions = {'XBTZ17': [
+            {'transactTime': past, 'lastQty': 1, 'lastPx': 9000, 'side': 'Buy', 'orderID': 'o1', 'execID': 'e1'},
+            {'transactTime': now, 'lastQty': 5, 'lastPx': 9000, 'side': 'Buy', 'orderID': 'o2'},
+            {'transactTime': now, 'lastQty': 7, 'lastPx': 9001, 'side': 'Sell', 'orderID': 'o3'},
+        ]}
+
+        account = _Bitmex(self.context, key='test', secret='test')
+
+        # Boundary rows returned again every cycle, counted once.
+        for _ in range(3):
+            account.poll()
+
+        self.assertEqual(self.__volume('XBT:quarterly'), 13.0)
+
+        rows = self.context.get_journal().load('bitmex', 'XBTZ17', 0)[1]
+
+        self.assertEqual(sorted(v for t, v in rows), [1.0, 5.0, 7.0])
+
+    def test_rolled_over(self):
+        _Bitmex.executions = {'XBTZ17': [{'transactTime': _iso(time() - 10), 'lastQty': 3, 'execID': 'e1'}]}
+
+        account = _Bitmex(self.context, key='test', secret='test')
+        account.poll()
+
+        self.assertEqual(self.__volume('XBT:quarterly'), 3.0)
+
+        # Rolled over to the next quarter, aggregated from its own executions.
+        account.symbols = ['XBTUSD', 'XBTH18', 'XBJZ17']
+        account.poll()
+
+        self.assertEqual(self.__volume('XBT:quarterly'), 0.0)
+
+
+if __name__ == '__main__':
+    main()